@@ -11,97 +11,392 @@ Este módulo implementa o agente principal que:
 
 
 import os
+import re
+import copy
 import json
+import asyncio
+import itertools
+import orjson
+import time
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Literal, Tuple, Optional, Iterator, Iterable, IO
+
+from pydantic import BaseModel, ValidationError, confloat
 
 # LangChain/LCEL Imports
-from langchain_community.embeddings import OpenAIEmbeddings
+from langchain_community.embeddings import OpenAIEmbeddings, FastEmbedEmbeddings
 from langchain_community.chat_models import ChatOpenAI
-from langchain_community.vectorstores import Chroma
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
 
 # Imports locais
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.preprocessor import LogPreprocessor
+from utils.cache import SQLiteCache, ResultCache
+from utils.emb_cache import EmbeddingCache, CachedEmbeddings
+from utils.vector_backend import VectorBackend, create_vector_backend
+from utils.timing import timed, report_latencies
+
+
+# Bancos vetoriais já abertos no processo, por (caminho absoluto, backend), com o lock que
+# serializa seu acesso: novas instâncias do agente reaproveitam o índice sem recarregá-lo do disco
+_VS_CACHE = {}
+_VS_CACHE_LOCK = threading.Lock()
+# Contador monotônico compartilhado: ids únicos mesmo entre agentes que usam o mesmo banco
+_ID_SEQUENCE = itertools.count()
+
+# Modelo de embeddings local (ONNX Runtime via FastEmbed): 384 dimensões, sem chamadas de rede
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _create_embeddings(provider: str, openai_api_key: str, cache_path: Optional[str] = None):
+    """
+    Cria o modelo de embeddings usado na indexação e na busca de logs similares.
+
+    Args:
+        provider (str): 'local' (FastEmbed/ONNX) ou 'openai'
+        openai_api_key (str): Chave da API, usada apenas pelo provedor 'openai'
+        cache_path (str): Arquivo SQLite do cache de embeddings (None desativa o cache)
+    """
+    if provider == "local":
+        embeddings = FastEmbedEmbeddings(model_name=LOCAL_EMBEDDING_MODEL)
+        namespace = f"local:{LOCAL_EMBEDDING_MODEL}"
+    elif provider == "openai":
+        embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
+        namespace = f"openai:{embeddings.model}"
+    else:
+        raise ValueError(f"Provedor de embeddings desconhecido: {provider}")
+
+    if cache_path is None:
+        return embeddings
+    return CachedEmbeddings(embeddings, EmbeddingCache(cache_path), namespace)
+
+
+class AnalysisOut(BaseModel):
+    """
+    Esquema estrito da análise retornada pelo LLM (validado em uma única passada pelo pydantic-core).
+    """
+    explanation: str
+    possible_causes: List[str]
+    severity: Literal['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+    recommendations: List[str]
+    confidence_score: confloat(ge=0, le=1)
+
+
+# JSON Schema equivalente ao AnalysisOut, enviado à OpenAI (Structured Outputs) para que
+# o modelo já responda no formato final e o caminho rápido de validação seja sempre usado
+ANALYSIS_JSON_SCHEMA = {
+    "name": "log_analysis",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "explanation": {"type": "string"},
+            "possible_causes": {"type": "array", "items": {"type": "string"}},
+            "severity": {"type": "string", "enum": ["LOW", "MEDIUM", "HIGH", "CRITICAL"]},
+            "recommendations": {"type": "array", "items": {"type": "string"}},
+            "confidence_score": {"type": "number"}
+        },
+        "required": ["explanation", "possible_causes", "severity", "recommendations", "confidence_score"],
+        "additionalProperties": False
+    }
+}
+
+# Famílias de modelos que aceitam response_format do tipo json_schema
+_JSON_SCHEMA_MODELS = ("gpt-4o", "gpt-4.1", "o1", "o3", "o4")
+
+
+def _response_format(model_name: str) -> Dict:
+    """
+    Usa Structured Outputs quando o modelo suporta; caso contrário, modo JSON simples.
+    """
+    if model_name.startswith(_JSON_SCHEMA_MODELS):
+        return {"type": "json_schema", "json_schema": ANALYSIS_JSON_SCHEMA}
+    return {"type": "json_object"}
+
+
+# Prompt de análise pré-separado: instruções estáticas (system) e dados por chamada (user)
+_SYSTEM_STATIC = """Você é um QA especialista em análise de logs e SRE.
+Sua tarefa é analisar uma mensagem de erro, usando o contexto de logs similares, e retornar uma análise estruturada em JSON.
+
+Retorne sua análise em um formato JSON contendo as chaves: "explanation", "possible_causes", "severity", "recommendations", "confidence_score".
+O valor de "possible_causes" e "recommendations" DEVE ser uma lista de strings.
+O valor de "severity" deve ser uma das seguintes opções: "LOW", "MEDIUM", "HIGH", "CRITICAL".
+O valor de "confidence_score" deve ser um número entre 0 e 1."""
+
+_USER_FMT = """CONTEXTO (Logs similares do histórico):
+{context}
+
+MENSAGEM DE ERRO ATUAL PARA ANÁLISE:
+{input}"""
+
+
+_VALID_SEVERITIES = frozenset(('LOW', 'MEDIUM', 'HIGH', 'CRITICAL'))
+
+
+def _coerce_text_list(value) -> List[str]:
+    if type(value) is list:
+        return value
+    return [value if type(value) is str else str(value)]
+
+
+def _coerce_severity(value) -> str:
+    severity = str(value).upper()
+    return severity if severity in _VALID_SEVERITIES else 'MEDIUM'
+
+
+def _coerce_confidence(value) -> float:
+    try:
+        confidence = float(value)
+    except (ValueError, TypeError):
+        return 0.5
+    return 0.0 if confidence < 0 else 1.0 if confidence > 1 else confidence
+
+
+# Regras por campo do esquema: (valor padrão, função de correção)
+_FIELD_RULES = {
+    'explanation': ('Explicação não fornecida pelo modelo.', str),
+    'possible_causes': ('Nenhuma causa provável encontrada.', _coerce_text_list),
+    'severity': ('MEDIUM', _coerce_severity),
+    'recommendations': ('Nenhuma recomendação disponível.', _coerce_text_list),
+    'confidence_score': (0.5, _coerce_confidence),
+}
+
+
+def _validate_analysis(data: Dict) -> Dict:
+    """
+    Valida e corrige os campos do esquema de análise retornado pelo LLM,
+    despachando cada campo para sua função de correção.
+    """
+    get = data.get
+    for field, (default, coerce) in _FIELD_RULES.items():
+        data[field] = coerce(get(field, default))
+    return data
 
 
 class LogAnalyzerAgent:
     """
     Agente de análise de logs com sanitização manual de dados para máxima robustez.
     """
+
+    # Cercas markdown (```json ... ```) ao redor da resposta do LLM
+    _FENCE_RE = re.compile(rb'^\s*```(?:json)?\s*|\s*```\s*$')
+
+    # Resposta padrão para JSON inválido; cada chamada parte de uma cópia rasa
+    _INVALID_JSON_TEMPLATE = {
+        "explanation": "O modelo de IA retornou uma resposta em formato JSON inválido.",
+        "possible_causes": ("Erro de formatação do LLM", "Resposta malformada"),
+        "severity": "MEDIUM",
+        "recommendations": ("Tente novamente a análise", "Verifique a conectividade com a API"),
+        "confidence_score": 0.1,
+    }
+
+    # Quantidade de textos enviados por requisição à API de embeddings
+    EMBEDDING_BATCH_SIZE = 200
+    # Quantidade de logs similares recuperados como contexto para cada erro
+    SIMILAR_LOGS_K = 3
+    # Vizinhos buscados por consulta: a coleção mistura chunks de log e análises indexadas
+    VECTOR_QUERY_K = 8
+    # Limite de chamadas simultâneas ao LLM (respeita o rate limit da API)
+    MAX_CONCURRENT_ANALYSES = 8
+    # Quantidade de vetores inseridos que dispara a persistência do banco vetorial
+    PERSIST_EVERY = 10_000
+    # Contextos recuperados mantidos em cache (por mensagem normalizada)
+    CONTEXT_CACHE_SIZE = 1024
+    # Entradas do cache de análises mantidas em memória
+    ANALYSIS_CACHE_SIZE = 4096
+    # Distância máxima do vizinho mais próximo para reaproveitar sua análise sem chamar o LLM
+    REUSE_DISTANCE_THRESHOLD = 0.05
+    # Capacidade das filas entre as etapas do pipeline (pré-processamento → embeddings → LLM)
+    PIPELINE_QUEUE_SIZE = 100
+    # Tempo máximo (segundos) de espera por novos chunks antes de fechar um lote incompleto
+    EMBEDDING_BATCH_WAIT = 0.5
+    # Lotes em análise ou aguardando publicação em ordem ao mesmo tempo (limita a memória)
+    MAX_PENDING_BATCHES = 4
+    # Intervalo (segundos) com que as etapas bloqueadas em filas verificam o sinal de parada
+    PIPELINE_POLL_INTERVAL = 0.1
+
     def __init__(self,
                  openai_api_key: str,
                  vectorstore_path: str = "./vectorstore",
-                 model_name: str = "gpt-4o-mini"):
+                 model_name: str = "gpt-4o-mini",
+                 vector_backend: str = "faiss",
+                 embedding_provider: str = "local",
+                 result_cache: ResultCache = None):
         
         self.openai_api_key = openai_api_key
         self.vectorstore_path = vectorstore_path
+        self.vector_backend = vector_backend
+        self.embedding_provider = embedding_provider
+        # Cache opcional das análises por chunk (hash do conteúdo + modelo)
+        self.result_cache = result_cache
         self.model_name = model_name
         self.preprocessor = LogPreprocessor()
+        # Cache de análises por mensagem normalizada, persistido entre execuções
+        self.analysis_cache = SQLiteCache(
+            os.path.join(vectorstore_path, "analysis_cache.sqlite"),
+            maxsize=self.ANALYSIS_CACHE_SIZE
+        )
         
-        self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
+        # Embeddings locais por padrão; a API da OpenAI fica reservada ao LLM.
+        # Vetores já calculados são reaproveitados do cache persistente
+        self.embeddings = _create_embeddings(
+            embedding_provider, openai_api_key,
+            cache_path=os.path.join(vectorstore_path, "embcache.sqlite")
+        )
         self.llm = ChatOpenAI(
             openai_api_key=openai_api_key,
             model_name=model_name,
             temperature=0.1,
-            model_kwargs={"response_format": {"type": "json_object"}}
+            model_kwargs={"response_format": _response_format(model_name)}
         )
         
-        self.vectorstore = self._initialize_vectorstore()
+        # O lock serializa o acesso ao banco vetorial (compartilhado no processo) e ao
+        # cache de contextos entre as threads do pipeline
+        self.vectorstore, self._store_lock = self._initialize_vectorstore()
+        self._pending_writes = 0
+        self._context_cache = OrderedDict()
+        # Contador monotônico que garante ids únicos mesmo se o relógio não avançar
+        self._id_sequence = _ID_SEQUENCE
         self.analysis_chain = self._create_analysis_chain()
         
         print(f"✅ Agente inicializado com modelo {model_name} e arquitetura de sanitização manual.")
 
-    def _initialize_vectorstore(self) -> Chroma:
-        try:
-            os.makedirs(self.vectorstore_path, exist_ok=True)
-            db = Chroma(
-                persist_directory=self.vectorstore_path,
-                embedding_function=self.embeddings
-            )
-            print(f"✅ Banco vetorial inicializado em {self.vectorstore_path}")
-            return db
-        except Exception as e:
-            print(f"❌ Erro ao inicializar banco vetorial: {e}")
-            raise
+    def _initialize_vectorstore(self) -> Tuple[VectorBackend, threading.RLock]:
+        """
+        Abre o banco vetorial, reaproveitando a instância já aberta no processo
+        para o mesmo caminho e backend.
+        """
+        key = (os.path.abspath(self.vectorstore_path), self.vector_backend)
+        with _VS_CACHE_LOCK:
+            entry = _VS_CACHE.get(key)
+            if entry is not None:
+                return entry
+            try:
+                os.makedirs(self.vectorstore_path, exist_ok=True)
+                db = create_vector_backend(self.vector_backend, self.vectorstore_path)
+                print(f"✅ Banco vetorial ({self.vector_backend}) inicializado em {self.vectorstore_path}")
+            except Exception as e:
+                print(f"❌ Erro ao inicializar banco vetorial: {e}")
+                raise
+            entry = _VS_CACHE[key] = (db, threading.RLock())
+            return entry
 
-    def _format_docs(self, docs: List[Document]) -> str:
+    def _format_docs(self, matches: List[Dict]) -> str:
+        # Só chunks de log entram no contexto; análises indexadas servem apenas ao reaproveitamento
+        docs = [
+            match['document'] for match in matches
+            if match['metadata'].get('kind') != 'analysis'
+        ][:self.SIMILAR_LOGS_K]
         if not docs:
             return "Nenhum log similar encontrado no histórico."
-        return "\n\n".join(f"Log similar: {doc.page_content}" for doc in docs)
+        return "\n\n".join(f"Log similar: {doc}" for doc in docs)
 
-    def _create_analysis_chain(self):
+    @timed('embed_documents')
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    @timed('vector_query')
+    def _query_vectorstore(self, query_embeddings: List[List[float]], k: int) -> List[List[Dict]]:
+        return self.vectorstore.query(query_embeddings, k)
+
+    @timed('llm_invoke')
+    def _invoke_chain(self, payload: Dict) -> str:
+        return self.analysis_chain.invoke(payload)
+
+    @timed('llm_ainvoke')
+    async def _ainvoke_chain(self, payload: Dict) -> str:
+        return await self.analysis_chain.ainvoke(payload)
+
+    def _retrieve_contexts(self, messages: List[str]) -> List[Tuple[str, Optional[str]]]:
         """
-        Cria a cadeia de análise para retornar uma string JSON bruta.
+        Recupera o contexto (logs similares) de várias mensagens de uma só vez:
+        um embed_documents para todas as consultas e uma única busca no banco vetorial.
+        Contextos já recuperados para a mesma mensagem normalizada vêm do cache.
+
+        Returns:
+            List[Tuple[str, Optional[str]]]: Para cada mensagem, o contexto formatado e,
+            se houver um erro quase idêntico já analisado pelo mesmo modelo, a análise
+            dele em JSON (ou None)
         """
-        retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
-        
-        template = """Você é um QA especialista em análise de logs e SRE.
-        Sua tarefa é analisar uma mensagem de erro, usando o contexto de logs similares, e retornar uma análise estruturada em JSON.
-        
+        if not messages:
+            return []
+
+        norms = [self.preprocessor.normalize_message(message) for message in messages]
+        resolved = {}
+        pending = {}
+        with self._store_lock:
+            for norm, message in zip(norms, messages):
+                if norm in resolved or norm in pending:
+                    continue
+                if norm in self._context_cache:
+                    self._context_cache.move_to_end(norm)
+                    resolved[norm] = self._context_cache[norm]
+                else:
+                    pending[norm] = message
+
+        if pending:
+            pending_messages = list(pending.values())
+            query_embeddings = []
+            for start in range(0, len(pending_messages), self.EMBEDDING_BATCH_SIZE):
+                query_embeddings.extend(
+                    self._embed_documents(pending_messages[start:start + self.EMBEDDING_BATCH_SIZE])
+                )
+
+            with self._store_lock:
+                try:
+                    matches = self._query_vectorstore(query_embeddings, self.VECTOR_QUERY_K)
+                    cacheable = True
+                except Exception as e:
+                    print(f"⚠️ Falha na busca de logs similares: {e}")
+                    matches = [[] for _ in pending_messages]
+                    cacheable = False
 
-        CONTEXTO (Logs similares do histórico):
-        {context}
+                for norm, row in zip(pending, matches):
+                    context = self._format_docs(row)
+                    # Análise reaproveitada só se produzida pelo modelo atual (os caches são por modelo)
+                    prior = next(
+                        (
+                            match['metadata']['analysis'] for match in row
+                            if match['distance'] < self.REUSE_DISTANCE_THRESHOLD
+                            and match['metadata'].get('kind') == 'analysis'
+                            and match['metadata'].get('model_name') == self.model_name
+                        ),
+                        None
+                    )
+                    resolved[norm] = (context, prior)
+                    if cacheable:
+                        self._context_cache[norm] = resolved[norm]
 
-        MENSAGEM DE ERRO ATUAL PARA ANÁLISE:
-        {input}
+                while len(self._context_cache) > self.CONTEXT_CACHE_SIZE:
+                    self._context_cache.popitem(last=False)
 
-        Retorne sua análise em um formato JSON contendo as chaves: "explanation", "possible_causes", "severity", "recommendations", "confidence_score".
-        O valor de "possible_causes" e "recommendations" DEVE ser uma lista de strings.
-        O valor de "severity" deve ser uma das seguintes opções: "LOW", "MEDIUM", "HIGH", "CRITICAL".
-        O valor de "confidence_score" deve ser um número entre 0 e 1.
+        return [resolved[norm] for norm in norms]
+
+    def _render_messages(self, payload: Dict) -> List[Dict]:
+        """
+        Monta as mensagens do prompt a partir de {"context", "input"}: a parte de
+        sistema é fixa e só a mensagem do usuário é formatada a cada chamada.
+        """
+        return [
+            {"role": "system", "content": _SYSTEM_STATIC},
+            {"role": "user", "content": _USER_FMT.format(context=payload['context'], input=payload['input'])}
+        ]
+
+    def _create_analysis_chain(self):
+        """
+        Cria a cadeia de análise para retornar uma string JSON bruta.
+        A cadeia recebe {"context", "input"}; o contexto é recuperado antes, em lote.
         """
-        
-        prompt = ChatPromptTemplate.from_template(template)
 
         chain = (
-            {"context": retriever | self._format_docs, "input": RunnablePassthrough()}
-            | prompt
+            RunnableLambda(self._render_messages)
             | self.llm
             | StrOutputParser()
         )
@@ -112,51 +407,15 @@ class LogAnalyzerAgent:
         Recebe a string JSON bruta do LLM e a transforma em um dicionário Python limpo e seguro.
         """
         try:
-            # Remove possíveis caracteres de formatação markdown
-            json_string = json_string.strip()
-            if json_string.startswith('```json'):
-                json_string = json_string[7:]
-            if json_string.endswith('```'):
-                json_string = json_string[:-3]
-            json_string = json_string.strip()
-            
-            data = json.loads(json_string)
-            
-            # Sanitização robusta dos campos
-            if 'possible_causes' not in data or not isinstance(data.get('possible_causes'), list):
-                causes = data.get('possible_causes', 'Nenhuma causa provável encontrada.')
-                if isinstance(causes, str):
-                    data['possible_causes'] = [causes]
-                else:
-                    data['possible_causes'] = [str(causes)]
-
-            if 'recommendations' not in data or not isinstance(data.get('recommendations'), list):
-                recommendations = data.get('recommendations', 'Nenhuma recomendação disponível.')
-                if isinstance(recommendations, str):
-                    data['recommendations'] = [recommendations]
-                else:
-                    data['recommendations'] = [str(recommendations)]
-
-            # Garantir que explanation é uma string
-            data['explanation'] = str(data.get('explanation', 'Explicação não fornecida pelo modelo.'))
+            # Remove possíveis caracteres de formatação markdown (direto nos bytes lidos pelo orjson)
+            raw = self._FENCE_RE.sub(b'', json_string.encode('utf-8'))
             
-            # Garantir que severity é válido
-            valid_severities = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
-            severity = str(data.get('severity', 'MEDIUM')).upper()
-            if severity not in valid_severities:
-                severity = 'MEDIUM'
-            data['severity'] = severity
-            
-            # Garantir que confidence_score é um número válido
             try:
-                confidence = float(data.get('confidence_score', 0.5))
-                if confidence < 0:
-                    confidence = 0.0
-                elif confidence > 1:
-                    confidence = 1.0
-                data['confidence_score'] = confidence
-            except (ValueError, TypeError):
-                data['confidence_score'] = 0.5
+                # Caminho rápido: resposta já no esquema, parse + validação em Rust
+                data = AnalysisOut.model_validate_json(raw).model_dump()
+            except ValidationError:
+                # Caminho tolerante: corrige campos ausentes ou com tipo inesperado
+                data = _validate_analysis(orjson.loads(raw))
             
             print(f"✅ JSON sanitizado com sucesso. Severity: {data['severity']}, Confidence: {data['confidence_score']}")
             return data
@@ -164,14 +423,12 @@ class LogAnalyzerAgent:
         except json.JSONDecodeError as e:
             print(f"❌ Falha ao decodificar o JSON da resposta do LLM. Erro: {e}")
             print(f"Resposta bruta: {json_string}")
-            return {
-                "explanation": "O modelo de IA retornou uma resposta em formato JSON inválido.",
-                "possible_causes": ["Erro de formatação do LLM", "Resposta malformada"],
-                "severity": "MEDIUM",
-                "recommendations": ["Tente novamente a análise", "Verifique a conectividade com a API"],
-                "confidence_score": 0.1,
-                "raw_response": json_string[:500]  # Limitar tamanho para debug
-            }
+            out = self._INVALID_JSON_TEMPLATE.copy()
+            # Listas novas a cada chamada: o template guarda tuplas imutáveis
+            out["possible_causes"] = list(out["possible_causes"])
+            out["recommendations"] = list(out["recommendations"])
+            out["raw_response"] = json_string[:500]  # Limitar tamanho para debug
+            return out
         except Exception as e:
             print(f"❌ Erro inesperado ao sanitizar a saída: {e}")
             return {
@@ -179,12 +436,86 @@ class LogAnalyzerAgent:
                 "possible_causes": ["Erro interno do sistema"],
                 "severity": "MEDIUM", 
                 "recommendations": ["Contacte o administrador do sistema"],
-                "confidence_score": 0.0
+                "confidence_score": 0.0,
+                "error_details": str(e)
             }
 
-    def analyze_log_entry(self, log_entry_message: str) -> Dict:
+    def _cache_key(self, log_entry_message: str) -> str:
+        """
+        Chave do cache de análises: modelo + mensagem normalizada.
+        """
+        return f"{self.model_name}:{self.preprocessor.normalize_message(log_entry_message)}"
+
+    def _get_cached_analysis(self, cache_key: str) -> Dict:
+        """
+        Retorna uma cópia nova da análise em cache, ou None.
+        """
+        cached = self.analysis_cache.get(cache_key)
+        return json.loads(cached) if cached is not None else None
+
+    def _store_analysis(self, cache_key: str, analysis: Dict) -> bool:
+        """
+        Guarda a análise no cache, exceto respostas de falha.
+        Retorna True se a análise foi guardada.
+        """
+        if 'raw_response' in analysis or 'error_details' in analysis:
+            return False
+        self.analysis_cache.put(cache_key, json.dumps(analysis, ensure_ascii=False))
+        return True
+
+    def _index_analyses(self, analyzed: List[Tuple[str, Dict]]):
+        """
+        Indexa as mensagens de erro analisadas com a análise nos metadados, para que
+        erros quase idênticos a reaproveitem na busca, sem nova chamada ao LLM.
+        Cada vetor leva o tipo ('analysis') e o modelo que produziu a análise.
+        """
+        now = datetime.now()
+        inserted_at = now.isoformat()
+        base_ts = now.timestamp()
+        try:
+            for start in range(0, len(analyzed), self.EMBEDDING_BATCH_SIZE):
+                batch = analyzed[start:start + self.EMBEDDING_BATCH_SIZE]
+                messages = [message for message, _ in batch]
+                batch_embeddings = self._embed_documents(messages)
+                metadatas = [
+                    {
+                        'kind': 'analysis',
+                        'model_name': self.model_name,
+                        'analysis': json.dumps(analysis, ensure_ascii=False),
+                        'timestamp': inserted_at
+                    }
+                    for _, analysis in batch
+                ]
+                ids = [f"analysis_{base_ts}_{next(self._id_sequence)}" for _ in batch]
+                with self._store_lock:
+                    self.vectorstore.add(batch_embeddings, metadatas, ids, messages)
+                    self._context_cache.clear()
+
+            with self._store_lock:
+                self._pending_writes += len(analyzed)
+            if self._pending_writes >= self.PERSIST_EVERY:
+                self.flush()
+        except Exception as e:
+            print(f"⚠️ Falha ao indexar análises no banco vetorial: {e}")
+
+    def _analysis_failure(self, error: Exception) -> Dict:
+        """
+        Monta o resultado padrão para falhas na execução da cadeia de análise.
+        """
+        print(f"❌ Erro crítico na execução da cadeia de análise: {error}")
+        return {
+            "explanation": f"Falha crítica ao analisar o log: {str(error)}",
+            "possible_causes": [f"Erro de sistema: {type(error).__name__}"], 
+            "recommendations": ["Verifique a configuração do sistema", "Tente novamente"], 
+            "severity": "HIGH", 
+            "confidence_score": 0.0,
+            "error_details": str(error)
+        }
+
+    def analyze_log_entry(self, log_entry_message: str, context: str = None) -> Dict:
         """
         Analisa uma entrada de log e retorna um dicionário com a análise.
+        Se o contexto de logs similares não for informado, ele é recuperado aqui.
         """
         try:
             print(f"🔄 Analisando erro: \"{log_entry_message[:80]}...\"")
@@ -193,25 +524,105 @@ class LogAnalyzerAgent:
             if not log_entry_message or not isinstance(log_entry_message, str):
                 raise ValueError("Mensagem de log inválida ou vazia")
             
+            cache_key = self._cache_key(log_entry_message)
+            cached_analysis = self._get_cached_analysis(cache_key)
+            if cached_analysis is not None:
+                print("✅ Análise reaproveitada do cache")
+                return cached_analysis
+            
+            if context is None:
+                context, prior = self._retrieve_contexts([log_entry_message])[0]
+                if prior is not None:
+                    print("✅ Análise reaproveitada de erro quase idêntico no banco vetorial")
+                    prior_analysis = json.loads(prior)
+                    self._store_analysis(cache_key, prior_analysis)
+                    return prior_analysis
+            
             # Executa a cadeia de análise
-            raw_json_output = self.analysis_chain.invoke(log_entry_message)
+            raw_json_output = self._invoke_chain({"context": context, "input": log_entry_message})
             
             # Sanitiza a saída
             clean_analysis = self._sanitize_llm_output(raw_json_output)
+            if self._store_analysis(cache_key, clean_analysis):
+                self._index_analyses([(log_entry_message, clean_analysis)])
 
             print(f"✅ Análise concluída com confiança {clean_analysis.get('confidence_score', 'N/A')}")
             return clean_analysis
             
         except Exception as e:
-            print(f"❌ Erro crítico na execução da cadeia de análise: {e}")
-            return {
-                "explanation": f"Falha crítica ao analisar o log: {str(e)}",
-                "possible_causes": [f"Erro de sistema: {type(e).__name__}"], 
-                "recommendations": ["Verifique a configuração do sistema", "Tente novamente"], 
-                "severity": "HIGH", 
-                "confidence_score": 0.0,
-                "error_details": str(e)
-            }
+            return self._analysis_failure(e)
+
+    async def _analyze_async(self, log_entry_message: str, context: str) -> Dict:
+        """
+        Versão assíncrona de analyze_log_entry, usando ainvoke na cadeia.
+        """
+        try:
+            if not log_entry_message or not isinstance(log_entry_message, str):
+                raise ValueError("Mensagem de log inválida ou vazia")
+
+            raw_json_output = await self._ainvoke_chain({"context": context, "input": log_entry_message})
+            return self._sanitize_llm_output(raw_json_output)
+
+        except Exception as e:
+            return self._analysis_failure(e)
+
+    async def _analyze_all(self, error_entries: List[Dict], semaphore: asyncio.Semaphore = None) -> List[Dict]:
+        """
+        Analisa todas as entradas de erro em paralelo, limitando a concorrência
+        com um semáforo (que pode ser compartilhado entre lotes). A ordem dos
+        resultados segue a ordem das entradas. Mensagens repetidas (após
+        normalização) e já presentes no cache não geram novas chamadas de
+        embedding nem de LLM.
+        """
+        messages = [entry['message'] for entry in error_entries]
+        keys = [self._cache_key(message) for message in messages]
+
+        analyses_by_key = {}
+        pending = {}
+        for key, message in zip(keys, messages):
+            if key in analyses_by_key or key in pending:
+                continue
+            cached_analysis = self._get_cached_analysis(key)
+            if cached_analysis is not None:
+                analyses_by_key[key] = cached_analysis
+            else:
+                pending[key] = message
+
+        print(f"✅ {len(messages) - len(pending)} erros reaproveitados (duplicados ou em cache)")
+
+        # A recuperação de contexto é bloqueante (API de embeddings): roda fora do event loop
+        loop = asyncio.get_running_loop()
+        contexts = await loop.run_in_executor(None, self._retrieve_contexts, list(pending.values()))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_ANALYSES)
+
+        # Erros quase idênticos a um já analisado no banco vetorial reaproveitam a análise
+        to_analyze = []
+        for (key, message), (context, prior) in zip(pending.items(), contexts):
+            if prior is not None:
+                analyses_by_key[key] = json.loads(prior)
+                self._store_analysis(key, analyses_by_key[key])
+            else:
+                to_analyze.append((key, message, context))
+        if len(to_analyze) < len(pending):
+            print(f"✅ {len(pending) - len(to_analyze)} erros reaproveitados por similaridade no banco vetorial")
+
+        fresh = []
+
+        async def bounded(key: str, message: str, context: str):
+            async with semaphore:
+                analysis = await self._analyze_async(message, context)
+            if self._store_analysis(key, analysis):
+                fresh.append((message, analysis))
+            analyses_by_key[key] = analysis
+
+        await asyncio.gather(*[bounded(key, message, context) for key, message, context in to_analyze])
+
+        if fresh:
+            await loop.run_in_executor(None, self._index_analyses, fresh)
+
+        # Cada entrada recebe sua própria cópia, evitando aliasing entre duplicados
+        return [copy.deepcopy(analyses_by_key[key]) for key in keys]
 
     def add_logs_to_vectorstore(self, chunks: List[Dict]) -> int:
         """
@@ -220,53 +631,470 @@ class LogAnalyzerAgent:
         if not chunks:
             return 0
         
-        texts = [chunk['text'] for chunk in chunks]
-        metadatas = [
-            {
+        # Uma única passada sobre os chunks preenche as três listas paralelas;
+        # o horário da inserção é calculado uma vez para todo o lote
+        n = len(chunks)
+        texts = [None] * n
+        metadatas = [None] * n
+        ids = [None] * n
+        now = datetime.now()
+        inserted_at = now.isoformat()
+        base_ts = now.timestamp()
+        for i, chunk in enumerate(chunks):
+            texts[i] = chunk['text']
+            metadatas[i] = {
+                'kind': 'chunk',
                 'chunk_id': chunk['chunk_id'],
                 'error_count': chunk['error_count'],
                 'components': ','.join(chunk['components']),
                 'levels': ','.join(chunk['levels']),
                 'token_count': chunk['token_count'],
-                'timestamp': datetime.now().isoformat()
-            } for chunk in chunks
-        ]
-        ids = [f"chunk_{chunk['chunk_id']}_{datetime.now().timestamp()}" for chunk in chunks]
+                'timestamp': inserted_at
+            }
+            ids[i] = f"chunk_{chunk['chunk_id']}_{base_ts}_{next(self._id_sequence)}"
         
         try:
-            self.vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
-            self.vectorstore.persist()
+            # Embeddings calculados em lotes (uma chamada à API por lote) e
+            # inseridos já prontos no backend, sem re-embedding
+            for start in range(0, len(texts), self.EMBEDDING_BATCH_SIZE):
+                end = start + self.EMBEDDING_BATCH_SIZE
+                batch_texts = texts[start:end]
+                batch_embeddings = self._embed_documents(batch_texts)
+                with self._store_lock:
+                    self.vectorstore.add(
+                        batch_embeddings,
+                        metadatas[start:end],
+                        ids[start:end],
+                        batch_texts
+                    )
+                    # Novos vetores podem mudar os vizinhos: invalida os contextos em cache
+                    self._context_cache.clear()
             print(f"✅ {len(chunks)} chunks adicionados ao banco vetorial")
+
+            # A persistência é amortizada: só grava ao acumular PERSIST_EVERY vetores
+            with self._store_lock:
+                self._pending_writes += len(chunks)
+            if self._pending_writes >= self.PERSIST_EVERY:
+                self.flush()
             return len(chunks)
         except Exception as e:
             print(f"❌ Erro ao adicionar chunks ao banco vetorial: {e}")
             return 0
 
-    def process_log_file(self, file_path: str) -> List[Dict]:
+    def flush(self):
+        """
+        Persiste no disco os vetores pendentes do banco vetorial.
+        """
+        with self._store_lock:
+            if not self._pending_writes:
+                return
+            try:
+                self.vectorstore.persist()
+                print(f"✅ Banco vetorial persistido ({self._pending_writes} vetores pendentes)")
+                self._pending_writes = 0
+            except Exception as e:
+                print(f"❌ Erro ao persistir banco vetorial: {e}")
+
+    def _queue_put(self, pipeline_queue: queue.Queue, item, stop: threading.Event) -> bool:
+        """
+        Publica um item em uma fila do pipeline, desistindo se a execução for interrompida.
+        Retorna True se o item foi publicado.
+        """
+        while not stop.is_set():
+            try:
+                pipeline_queue.put(item, timeout=self.PIPELINE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _queue_get(self, pipeline_queue: queue.Queue, stop: threading.Event):
+        """
+        Lê o próximo item de uma fila do pipeline; retorna None no sentinela de fim
+        ou se a execução for interrompida.
+        """
+        while not stop.is_set():
+            try:
+                return pipeline_queue.get(timeout=self.PIPELINE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+    def _produce_chunks(self, chunks: Iterator[Dict], chunk_queue: queue.Queue, stop: threading.Event):
+        """
+        Etapa 1 do pipeline: consome o gerador do pré-processamento (executado
+        nesta thread) e publica os chunks na fila.
         """
-        Processa um arquivo de log completo.
+        try:
+            for chunk in chunks:
+                if not self._queue_put(chunk_queue, chunk, stop):
+                    break
+        except Exception:
+            # Interrompe as demais etapas: a falha é propagada pelo resultado desta
+            stop.set()
+            raise
+        finally:
+            self._queue_put(chunk_queue, None, stop)
+
+    def _index_chunks(self, chunk_queue: queue.Queue, error_queue: queue.Queue, stop: threading.Event):
+        """
+        Etapa 2 do pipeline: insere os chunks no banco vetorial em lotes e repassa
+        os erros de cada lote já indexado para a etapa de análise, na ordem do arquivo.
+        """
+        batch = []
+        finished = False
+
+        def index_batch():
+            # Chunks já analisados em execuções anteriores não são reindexados nem reanalisados;
+            # suas análises seguem no mesmo item do lote, na posição do chunk
+            fresh_chunks = []
+            errors = []
+            spans = []
+            for chunk in batch:
+                key = self._chunk_cache_key(chunk)
+                cached = self.result_cache.get(key) if key is not None else None
+                if cached is None:
+                    fresh_chunks.append(chunk)
+                chunk_errors = [entry for entry in chunk['entries'] if entry['is_error']]
+                errors.extend(chunk_errors)
+                spans.append((key, len(chunk_errors), cached))
+
+            self.add_logs_to_vectorstore(fresh_chunks)
+            batch.clear()
+            if errors:
+                self._queue_put(error_queue, (errors, spans), stop)
+
+        try:
+            while not finished:
+                chunk = self._queue_get(chunk_queue, stop)
+                if chunk is None:
+                    break
+                deadline = time.monotonic() + self.EMBEDDING_BATCH_WAIT
+                while chunk is not None:
+                    batch.append(chunk)
+                    # Fecha o lote quando estiver cheio ou quando o prazo de espera se esgotar
+                    remaining = deadline - time.monotonic()
+                    if len(batch) >= self.EMBEDDING_BATCH_SIZE or remaining <= 0:
+                        break
+                    try:
+                        chunk = chunk_queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                finished = chunk is None
+                if stop.is_set():
+                    break
+                index_batch()
+        except Exception:
+            stop.set()
+            raise
+        finally:
+            self._queue_put(error_queue, None, stop)
+
+    def _chunk_cache_key(self, chunk: Dict) -> Optional[str]:
+        """
+        Chave do chunk no cache de resultados, ou None se o cache não estiver ativo.
+        """
+        if self.result_cache is None:
+            return None
+        return ResultCache.make_key(self.preprocessor.normalize_message(chunk['text']), self.model_name)
+
+    async def _analyze_chunks(self, errors: List[Dict], spans: List[Tuple[Optional[str], int, Optional[List[Dict]]]],
+                              semaphore: asyncio.Semaphore) -> List[Dict]:
+        """
+        Analisa os erros de um lote de chunks e guarda, por chunk, as análises no
+        cache de resultados (apenas chunks sem falhas de análise). Chunks que já
+        vêm com análises do cache não são reanalisados; a ordem dos erros é mantida.
+        """
+        pending = []
+        start = 0
+        for _, count, cached in spans:
+            if cached is None:
+                pending.extend(errors[start:start + count])
+            start += count
+        if len(pending) < len(errors):
+            print(f"✅ {len(errors) - len(pending)} erros reaproveitados do cache de resultados por chunk")
+
+        fresh = await self._analyze_all(pending, semaphore) if pending else []
+        analyses = []
+        position = 0
+        for key, count, cached in spans:
+            if cached is not None:
+                analyses.extend(cached)
+                continue
+            chunk_analyses = fresh[position:position + count]
+            position += count
+            analyses.extend(chunk_analyses)
+            if key is not None and not any('raw_response' in a or 'error_details' in a for a in chunk_analyses):
+                self.result_cache.put(key, chunk_analyses)
+        return analyses
+
+    async def _analyze_stream(self, error_queue: queue.Queue, result_queue: queue.Queue, stop: threading.Event):
+        """
+        Etapa 3 do pipeline: consome os lotes de erros à medida que chegam e os
+        analisa compartilhando um único semáforo de concorrência. Cada lote
+        concluído é publicado em result_queue como (erros, análises), na ordem
+        em que os lotes chegaram (a ordem do arquivo). No máximo
+        MAX_PENDING_BATCHES lotes ficam em andamento: ao atingir o limite a
+        leitura de error_queue pausa e a contrapressão chega às etapas anteriores.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_ANALYSES)
+        # Lotes em andamento, na ordem de chegada: (erros, tarefa)
+        pending = deque()
+        # Tarefas que terminaram com exceção: a falha de um lote interrompe a execução
+        failed = []
+
+        def batch_done(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                failed.append(task)
+
+        def publish_ready():
+            if failed:
+                raise failed[0].exception()
+            while pending and pending[0][1].done():
+                errors, task = pending.popleft()
+                result_queue.put((errors, task.result()))
+
+        try:
+            while True:
+                publish_ready()
+                if len(pending) >= self.MAX_PENDING_BATCHES:
+                    await asyncio.wait([pending[0][1]])
+                    continue
+                item = await loop.run_in_executor(None, self._queue_get, error_queue, stop)
+                if item is None:
+                    break
+                errors, spans = item
+                task = asyncio.ensure_future(self._analyze_chunks(errors, spans, semaphore))
+                task.add_done_callback(batch_done)
+                pending.append((errors, task))
+
+            while pending and not stop.is_set():
+                await asyncio.wait([pending[0][1]])
+                publish_ready()
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            # Interrompida a execução, os lotes ainda pendentes não gastam mais chamadas ao LLM
+            tasks = [task for _, task in pending]
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            result_queue.put(None)
+
+    def _run_pipeline(self, chunks: Iterator[Dict], raise_on_error: bool = False) -> Iterator[Dict]:
+        """
+        Executa o pipeline sobre um gerador de chunks, gerando cada resultado assim que fica pronto.
+
+        Pré-processamento, indexação no banco vetorial e análise pelo LLM rodam
+        em pipeline (threads ligadas por filas), de modo que os erros dos primeiros
+        chunks são analisados, e entregues, enquanto o restante ainda é lido e indexado.
+        Os resultados saem na ordem do arquivo. Se o consumidor parar antes do fim,
+        todas as etapas são interrompidas.
+
+        Args:
+            raise_on_error (bool): Repropaga a falha do pipeline em vez de apenas
+                registrá-la e encerrar com os resultados parciais
+        """
+        try:
+            count = 0
+            chunk_queue = queue.Queue(maxsize=self.PIPELINE_QUEUE_SIZE)
+            error_queue = queue.Queue(maxsize=self.PIPELINE_QUEUE_SIZE)
+            # Sem limite: o analisador nunca bloqueia ao publicar (a contrapressão vem de MAX_PENDING_BATCHES)
+            result_queue = queue.Queue()
+            # Sinal de parada compartilhado: falha em uma etapa ou consumidor que parou cedo
+            stop = threading.Event()
+            
+            print(f"🔄 Analisando erros em pipeline (até {self.MAX_CONCURRENT_ANALYSES} em paralelo)")
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                producer = pool.submit(self._produce_chunks, chunks, chunk_queue, stop)
+                indexer = pool.submit(self._index_chunks, chunk_queue, error_queue, stop)
+                analyzer = pool.submit(asyncio.run, self._analyze_stream(error_queue, result_queue, stop))
+                
+                try:
+                    for errors, analyses in iter(result_queue.get, None):
+                        for entry, analysis in zip(errors, analyses):
+                            analysis['error_message'] = entry['message']
+                            analysis['timestamp'] = datetime.now().isoformat()
+                            count += 1
+                            yield analysis
+                finally:
+                    # Sem efeito ao fim normal; se o consumidor parou, as etapas encerram sem
+                    # esperar o restante do arquivo
+                    stop.set()
+                
+                # Propaga exceções das etapas do pipeline
+                producer.result()
+                indexer.result()
+                analyzer.result()
+            
+            print(f"✅ Análise de log concluída: {count} erros analisados")
+            
+        except Exception as e:
+            print(f"❌ Erro ao processar log: {e}")
+            if raise_on_error:
+                raise
+        finally:
+            self.flush()
+            report_latencies()
+
+    def iter_log_file(self, file_path: str) -> Iterator[Dict]:
+        """
+        Processa um arquivo de log completo, gerando cada resultado assim que fica pronto.
         """
         print(f"🔄 Processando arquivo de log: {file_path}")
-        
+        yield from self._run_pipeline(self.preprocessor.iter_log_chunks(file_path))
+
+    def iter_log_content(self, content: str, raise_on_error: bool = False) -> Iterator[Dict]:
+        """
+        Processa um log já em memória (sem arquivo temporário), gerando cada resultado assim que fica pronto.
+        Com raise_on_error, uma falha do pipeline é repropagada em vez de encerrar a geração.
+        """
+        print(f"🔄 Processando log em memória ({len(content)} caracteres)")
+        yield from self._run_pipeline(self.preprocessor.iter_content_chunks(content), raise_on_error)
+
+    def iter_log_stream(self, fp: IO[str]) -> Iterator[Dict]:
+        """
+        Processa um log lido de um objeto de arquivo (sem arquivo temporário),
+        gerando cada resultado assim que fica pronto.
+        """
+        print("🔄 Processando log a partir de stream")
+        yield from self._run_pipeline(self.preprocessor.iter_stream_chunks(fp))
+
+    def process_log_file(self, file_path: str) -> List[Dict]:
+        """
+        Processa um arquivo de log completo e retorna todos os resultados em uma lista.
+        Para arquivos grandes, prefira iter_log_file com stream_analysis_results.
+        """
+        return list(self.iter_log_file(file_path))
+
+    def process_log_content(self, content: str, raise_on_error: bool = False) -> List[Dict]:
+        """
+        Processa o conteúdo de um log já em memória e retorna todos os resultados em uma lista.
+        """
+        return list(self.iter_log_content(content, raise_on_error))
+
+    def process_log_stream(self, fp: IO[str]) -> List[Dict]:
+        """
+        Processa um log lido de um objeto de arquivo e retorna todos os resultados em uma lista.
+        """
+        return list(self.iter_log_stream(fp))
+
+    def _build_batch_request(self, custom_id: str, log_entry_message: str, context: str) -> Dict:
+        """
+        Monta uma requisição /v1/chat/completions da Batch API para uma mensagem de erro,
+        com o mesmo prompt e contexto recuperado usados pela cadeia síncrona.
+        """
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model_name,
+                "temperature": 0.1,
+                "response_format": _response_format(self.model_name),
+                "messages": self._render_messages({"context": context, "input": log_entry_message})
+            }
+        }
+
+    def process_log_file_batch(self, file_path: str, poll_interval: int = 30) -> List[Dict]:
+        """
+        Processa um arquivo de log usando a Batch API da OpenAI.
+
+        Indicado para execuções offline com muitos erros: custo reduzido pela metade,
+        porém com janela de conclusão de até 24h. Para uso interativo, use process_log_file.
+        """
+        from openai import OpenAI
+
+        print(f"🔄 Processando arquivo de log em lote (Batch API): {file_path}")
+
         try:
             chunks, _ = self.preprocessor.process_log_file(file_path)
             self.add_logs_to_vectorstore(chunks)
-            
-            results = []
+
             error_entries = [entry for chunk in chunks for entry in chunk['entries'] if entry['is_error']]
-            
-            for entry in error_entries:
-                analysis = self.analyze_log_entry(entry['message'])
+            if not error_entries:
+                print("✅ Nenhum erro para analisar")
+                return []
+
+            client = OpenAI(api_key=self.openai_api_key)
+
+            contexts = [context for context, _ in self._retrieve_contexts([entry['message'] for entry in error_entries])]
+
+            # Serializa uma requisição por erro em um arquivo JSONL temporário
+            with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8') as f:
+                batch_input_path = f.name
+                for i, (entry, context) in enumerate(zip(error_entries, contexts)):
+                    request = self._build_batch_request(f"error-{i}", entry['message'], context)
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+            try:
+                with open(batch_input_path, 'rb') as f:
+                    batch_file = client.files.create(file=f, purpose="batch")
+            finally:
+                os.remove(batch_input_path)
+
+            batch = client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            print(f"✅ Lote {batch.id} enviado com {len(error_entries)} requisições")
+
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                time.sleep(poll_interval)
+                batch = client.batches.retrieve(batch.id)
+                print(f"🔄 Lote {batch.id}: {batch.status}")
+
+            if batch.status != "completed" or not batch.output_file_id:
+                raise RuntimeError(f"Lote {batch.id} finalizado com status {batch.status}")
+
+            # Indexa as respostas pelo custom_id (a ordem do arquivo não é garantida)
+            responses = {}
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                if line.strip():
+                    item = json.loads(line)
+                    responses[item['custom_id']] = item
+
+            results = []
+            for i, entry in enumerate(error_entries):
+                body = ((responses.get(f"error-{i}") or {}).get('response') or {}).get('body') or {}
+                choices = body.get('choices')
+                if choices:
+                    analysis = self._sanitize_llm_output(choices[0]['message']['content'])
+                else:
+                    analysis = self._analysis_failure(RuntimeError(f"Sem resposta no lote para o erro {i}"))
                 analysis['error_message'] = entry['message']
                 analysis['timestamp'] = datetime.now().isoformat()
                 results.append(analysis)
-            
-            print(f"✅ Análise de arquivo concluída: {len(results)} erros analisados")
+
+            print(f"✅ Análise em lote concluída: {len(results)} erros analisados")
             return results
-            
+
         except Exception as e:
-            print(f"❌ Erro ao processar arquivo de log: {e}")
+            print(f"❌ Erro ao processar arquivo de log em lote: {e}")
             return []
+        finally:
+            self.flush()
+            report_latencies()
+
+    def stream_analysis_results(self, results: Iterable[Dict], output_path: str) -> Iterator[Dict]:
+        """
+        Grava os resultados em JSON Lines à medida que são produzidos, repassando
+        cada um adiante; a memória fica limitada a um registro por vez.
+        """
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        count = 0
+        with open(output_path, 'wb') as f:
+            for result in results:
+                f.write(orjson.dumps(result, default=str) + b"\n")
+                count += 1
+                yield result
+        print(f"✅ {count} resultados salvos em {output_path}")
 
     def save_analysis_results(self, results: List[Dict], output_path: str):
         """
@@ -298,6 +1126,7 @@ def main():
     log_file = "./data/example.log"
     if os.path.exists(log_file):
         results = agent.process_log_file(log_file)
+        agent.flush()
         if results:
             agent.save_analysis_results(results, "./output/analysis_results.json")
             print("\n📊 Análise concluída com sucesso.")
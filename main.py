@@ -11,59 +11,100 @@ Este script demonstra o uso completo do agente, incluindo:
 
 import os
 import sys
-import json
+import asyncio
 import argparse
+import functools
+import orjson
+import subprocess
+from collections import Counter
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 from dotenv import load_dotenv
 
 # Imports locais
 from agents.log_analyzer import LogAnalyzerAgent
 from utils.preprocessor import LogPreprocessor
+from utils.cache import ResultCache
+from utils.vector_backend import VECTOR_BACKENDS
 
 
-def setup_environment():
+@dataclass(frozen=True)
+class Config:
+    """
+    Configuração lida uma única vez do ambiente (após o load_dotenv).
+    """
+    openai_api_key: Optional[str]
+    slack_token: Optional[str]
+    slack_channel: str
+    discord_webhook_url: Optional[str]
+    
+    @classmethod
+    def from_env(cls) -> "Config":
+        return cls(
+            openai_api_key=os.getenv('OPENAI_API_KEY'),
+            slack_token=os.getenv('SLACK_TOKEN'),
+            slack_channel=os.getenv('SLACK_CHANNEL', '#qa-alerts'),
+            discord_webhook_url=os.getenv('DISCORD_WEBHOOK_URL')
+        )
+
+
+def setup_environment() -> Optional[Config]:
     """
     Configura o ambiente carregando variáveis do .env
+    
+    Returns:
+        Optional[Config]: Configuração carregada, ou None se faltar variável obrigatória
     """
     load_dotenv()
     
     # Verifica variáveis obrigatórias
     required_vars = ['OPENAI_API_KEY']
-    missing_vars = []
-    
-    for var in required_vars:
-        if not os.getenv(var):
-            missing_vars.append(var)
+    missing_vars = [var for var in required_vars if not os.environ.get(var)]
     
     if missing_vars:
         print(f"❌ Variáveis de ambiente obrigatórias não encontradas: {missing_vars}")
         print("Por favor, configure o arquivo .env baseado no .env.example")
-        return False
+        return None
     
     print("✅ Ambiente configurado com sucesso")
-    return True
+    return Config.from_env()
+
 
+_SLACK_CLIENT = None
 
-def send_slack_alert(message: str, channel: str = None):
+
+def _get_slack_client(token: str):
+    """
+    Retorna o cliente Slack compartilhado, criado no primeiro envio.
+    """
+    global _SLACK_CLIENT
+    if _SLACK_CLIENT is None or _SLACK_CLIENT.token != token:
+        from slack_sdk.web.async_client import AsyncWebClient
+        
+        _SLACK_CLIENT = AsyncWebClient(token=token)
+    return _SLACK_CLIENT
+
+
+async def send_slack_alert(message: str, config: Config, channel: str = None):
     """
     Envia alerta para o Slack.
     
     Args:
         message (str): Mensagem a ser enviada
+        config (Config): Configuração do ambiente
         channel (str): Canal do Slack (opcional)
     """
     try:
-        from slack_sdk import WebClient
-        
-        slack_token = os.getenv('SLACK_TOKEN')
+        slack_token = config.slack_token
         if not slack_token:
             print("⚠️ SLACK_TOKEN não configurado - pulando envio para Slack")
             return
         
-        client = WebClient(token=slack_token)
-        channel = channel or os.getenv('SLACK_CHANNEL', '#qa-alerts')
+        client = _get_slack_client(slack_token)
+        channel = channel or config.slack_channel
         
-        response = client.chat_postMessage(
+        response = await client.chat_postMessage(
             channel=channel,
             text=message,
             username="QA Log Agent",
@@ -76,22 +117,47 @@ def send_slack_alert(message: str, channel: str = None):
             print(f"❌ Erro ao enviar para Slack: {response['error']}")
             
     except ImportError:
-        print("⚠️ slack_sdk não instalado - pulando envio para Slack")
+        print("⚠️ slack_sdk/aiohttp não instalado - pulando envio para Slack")
     except Exception as e:
         print(f"❌ Erro ao enviar alerta Slack: {e}")
 
 
-def send_discord_alert(message: str):
+_DISCORD_SESSION = None
+
+
+def _get_discord_session():
+    """
+    Retorna a sessão HTTP compartilhada do Discord: conexões mantidas (keep-alive)
+    entre envios e retentativas automáticas para falhas transitórias.
+    """
+    global _DISCORD_SESSION
+    if _DISCORD_SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['POST'])
+        )
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry))
+        _DISCORD_SESSION = session
+    return _DISCORD_SESSION
+
+
+async def send_discord_alert(message: str, config: Config):
     """
     Envia alerta para o Discord via webhook.
     
     Args:
         message (str): Mensagem a ser enviada
+        config (Config): Configuração do ambiente
     """
     try:
-        import requests
-        
-        webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
+        webhook_url = config.discord_webhook_url
         if not webhook_url:
             print("⚠️ DISCORD_WEBHOOK_URL não configurado - pulando envio para Discord")
             return
@@ -102,7 +168,12 @@ def send_discord_alert(message: str):
             "avatar_url": "https://cdn-icons-png.flaticon.com/512/4712/4712027.png"
         }
         
-        response = requests.post(webhook_url, json=payload)
+        # O POST bloqueante roda em uma thread para não travar o envio paralelo ao Slack
+        session = _get_discord_session()
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            None, functools.partial(session.post, webhook_url, json=payload, timeout=5)
+        )
         
         if response.status_code == 204:
             print("✅ Alerta enviado para Discord")
@@ -115,41 +186,58 @@ def send_discord_alert(message: str):
         print(f"❌ Erro ao enviar alerta Discord: {e}")
 
 
-def format_alert_message(results):
+async def dispatch_alerts(message: str, config: Config):
+    """
+    Envia o alerta para Slack e Discord em paralelo; a falha de um não afeta o outro.
+    
+    Args:
+        message (str): Mensagem a ser enviada
+        config (Config): Configuração do ambiente
+    """
+    await asyncio.gather(
+        send_slack_alert(message, config),
+        send_discord_alert(message, config),
+        return_exceptions=True
+    )
+
+
+def format_alert_message(severities: Counter, critical_errors: list, generated_at: str):
     """
     Formata mensagem de alerta com resumo dos erros.
     
     Args:
-        results: Lista de resultados da análise
+        severities (Counter): Contagem de resultados por severidade
+        critical_errors (list): Primeiros resultados com severidade CRITICAL
+        generated_at (str): Data/hora da análise, já formatada
         
     Returns:
         str: Mensagem formatada
     """
-    if not results:
+    total = sum(severities.values())
+    if not total:
         return "🟢 Nenhum erro crítico detectado nos logs."
     
-    critical_errors = [r for r in results if r.severity == 'CRITICAL']
-    high_errors = [r for r in results if r.severity == 'HIGH']
-    
-    message = f"🚨 **Alerta de Logs de Erro - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}**\\n\\n"
-    message += f"📊 **Resumo:**\\n"
-    message += f"• Total de erros: {len(results)}\\n"
-    message += f"• Críticos: {len(critical_errors)}\\n"
-    message += f"• Alta prioridade: {len(high_errors)}\\n\\n"
+    parts = [
+        f"🚨 **Alerta de Logs de Erro - {generated_at}**\n\n",
+        "📊 **Resumo:**\n",
+        f"• Total de erros: {total}\n",
+        f"• Críticos: {severities['CRITICAL']}\n",
+        f"• Alta prioridade: {severities['HIGH']}\n\n",
+    ]
     
     if critical_errors:
-        message += "🔴 **Erros Críticos:**\\n"
+        parts.append("🔴 **Erros Críticos:**\n")
         for i, error in enumerate(critical_errors[:3], 1):
-            message += f"{i}. {error.error_message[:100]}...\\n"
+            parts.append(f"{i}. {error['error_message'][:100]}...\n")
         
-        if len(critical_errors) > 3:
-            message += f"... e mais {len(critical_errors) - 3} erros críticos\\n"
+        if severities['CRITICAL'] > 3:
+            parts.append(f"... e mais {severities['CRITICAL'] - 3} erros críticos\n")
     
-    message += "\\n📋 Verifique o relatório completo para mais detalhes."
-    return message
+    parts.append("\n📋 Verifique o relatório completo para mais detalhes.")
+    return "".join(parts)
 
 
-def analyze_logs_command(args):
+def analyze_logs_command(args, config: Config):
     """
     Comando para análise de logs.
     """
@@ -157,36 +245,48 @@ def analyze_logs_command(args):
     
     # Inicializa agente
     agent = LogAnalyzerAgent(
-        openai_api_key=os.getenv('OPENAI_API_KEY'),
+        openai_api_key=config.openai_api_key,
         vectorstore_path=args.vectorstore_path,
-        model_name=args.model
+        model_name=args.model,
+        vector_backend=args.vector_backend,
+        embedding_provider=args.embedding_provider,
+        # Chunks já analisados com o mesmo modelo são reaproveitados sem chamar o LLM
+        result_cache=ResultCache(os.path.join(args.vectorstore_path, "llm_cache"))
     )
     
-    # Processa arquivo
-    results = agent.process_log_file(args.log_file)
+    # Processa arquivo (Batch API para execuções offline de grande volume);
+    # no modo normal os resultados chegam um a um, à medida que ficam prontos
+    if args.batch:
+        results = agent.process_log_file_batch(args.log_file)
+    else:
+        results = agent.iter_log_file(args.log_file)
     
-    # Salva resultados
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_file = f"{args.output_path}/analysis_{timestamp}.json"
-    agent.save_analysis_results(results, output_file)
+    # Grava cada resultado em JSON Lines e, na mesma passada, acumula o resumo
+    started_at = datetime.now()
+    timestamp = started_at.strftime('%Y%m%d_%H%M%S')
+    output_file = f"{args.output_path}/analysis_{timestamp}.jsonl"
+    severities = Counter()
+    critical_errors = []
+    for result in agent.stream_analysis_results(results, output_file):
+        severities[result['severity']] += 1
+        # Só os três primeiros críticos aparecem no alerta
+        if result['severity'] == 'CRITICAL' and len(critical_errors) < 3:
+            critical_errors.append(result)
     
     # Envia alertas se configurado
     if args.send_alerts:
-        alert_message = format_alert_message(results)
-        send_slack_alert(alert_message)
-        send_discord_alert(alert_message)
+        alert_message = format_alert_message(
+            severities, critical_errors, started_at.strftime('%Y-%m-%d %H:%M:%S')
+        )
+        asyncio.run(dispatch_alerts(alert_message, config))
     
     # Mostra resumo
     print(f"\\n📊 Análise concluída:")
     print(f"• Arquivo processado: {args.log_file}")
-    print(f"• Erros analisados: {len(results)}")
+    print(f"• Erros analisados: {sum(severities.values())}")
     print(f"• Resultados salvos em: {output_file}")
     
-    if results:
-        severities = {}
-        for result in results:
-            severities[result.severity] = severities.get(result.severity, 0) + 1
-        
+    if severities:
         print(f"• Distribuição por severidade:")
         for severity, count in severities.items():
             print(f"  - {severity}: {count}")
@@ -206,8 +306,10 @@ def preprocess_command(args):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         chunks_file = f"{args.output_path}/chunks_{timestamp}.json"
         
-        with open(chunks_file, 'w', encoding='utf-8') as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False, default=str)
+        # Serializa tudo em C (orjson) e grava os bytes com uma única escrita
+        data = orjson.dumps(chunks, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str)
+        with open(chunks_file, 'wb') as f:
+            f.write(data)
         
         print(f"✅ Chunks salvos em: {chunks_file}")
     
@@ -219,9 +321,10 @@ def preprocess_command(args):
     print(f"• Palavras-chave de erro: {list(patterns['error_keywords'].keys())}")
 
 
-def main():
+@functools.lru_cache(maxsize=None)
+def _build_parser() -> argparse.ArgumentParser:
     """
-    Função principal com interface de linha de comando.
+    Constrói o parser da linha de comando uma única vez por processo.
     """
     parser = argparse.ArgumentParser(
         description="Agente IA para Análise Inteligente de Logs de Erro"
@@ -232,6 +335,10 @@ def main():
                        help='Diretório para salvar resultados')
     parser.add_argument('--vectorstore-path', default='./vectorstore',
                        help='Caminho para o banco vetorial')
+    parser.add_argument('--vector-backend', default=os.getenv('QA_VSTORE', 'faiss'), choices=VECTOR_BACKENDS,
+                       help='Backend do banco vetorial (padrão: variável QA_VSTORE ou faiss)')
+    parser.add_argument('--embedding-provider', default='local', choices=['local', 'openai'],
+                       help='Provedor de embeddings (as dimensões diferem: use um --vectorstore-path por provedor)')
     
     # Subcomandos
     subparsers = parser.add_subparsers(dest='command', help='Comandos disponíveis')
@@ -243,6 +350,8 @@ def main():
                                help='Modelo LLM a ser usado')
     analyze_parser.add_argument('--send-alerts', action='store_true',
                                help='Envia alertas para Slack/Discord')
+    analyze_parser.add_argument('--batch', action='store_true',
+                               help='Usa a Batch API da OpenAI (menor custo, conclusão em até 24h)')
     
     # Comando preprocess
     preprocess_parser = subparsers.add_parser('preprocess', 
@@ -257,10 +366,19 @@ def main():
     streamlit_parser = subparsers.add_parser('streamlit', 
                                            help='Inicia interface Streamlit')
     
+    return parser
+
+
+def main():
+    """
+    Função principal com interface de linha de comando.
+    """
+    parser = _build_parser()
     args = parser.parse_args()
     
     # Configura ambiente
-    if not setup_environment():
+    config = setup_environment()
+    if config is None:
         sys.exit(1)
     
     # Cria diretórios necessários
@@ -269,12 +387,12 @@ def main():
     
     # Executa comando
     if args.command == 'analyze':
-        analyze_logs_command(args)
+        analyze_logs_command(args, config)
     elif args.command == 'preprocess':
         preprocess_command(args)
     elif args.command == 'streamlit':
         print("🚀 Iniciando interface Streamlit...")
-        os.system("streamlit run streamlit_app.py")
+        subprocess.run(["streamlit", "run", "streamlit_app.py"], check=True)
     else:
         parser.print_help()
 
@@ -10,29 +10,328 @@ Esta aplicação web permite:
 
 import streamlit as st
 from dotenv import load_dotenv
-import json
+import orjson
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from io import StringIO
+from io import TextIOWrapper
 import os
+import time
+import queue
+import hashlib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
 
 # Imports locais
 from agents.log_analyzer import LogAnalyzerAgent
 from utils.preprocessor import LogPreprocessor
+from utils.cache import ResultCache
 
 load_dotenv()
 
+# Ordem, emojis e cores por severidade (compartilhados por métricas, filtros, gráficos e notificações)
+_SEVERITY_ORDER = ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW', 'UNKNOWN')
 
-def send_discord_notification(results, analysis_summary=None):
+_SEVERITY_EMOJIS = {
+    'CRITICAL': '🔴',
+    'HIGH': '🟠',
+    'MEDIUM': '🟡',
+    'LOW': '🟢',
+    'UNKNOWN': '⚪'
+}
+
+_SEVERITY_COLORS = {
+    'CRITICAL': '#ef4444',
+    'HIGH': '#f97316',
+    'MEDIUM': '#eab308',
+    'LOW': '#22c55e',
+    'UNKNOWN': '#6b7280'
+}
+
+# Resultados detalhados exibidos por página
+RESULTS_PAGE_SIZE = 20
+
+# Configuração do Plotly.js compartilhada pelos gráficos
+_PLOTLY_CONFIG = {"responsive": True, "staticPlot": False, "displaylogo": False}
+
+# Cores do embed do Discord (inteiro RGB)
+_EMBED_COLOR_CRITICAL = 15158332  # Vermelho
+_EMBED_COLOR_HIGH = 16753920      # Laranja
+_EMBED_COLOR_MEDIUM = 16776960    # Amarelo
+_EMBED_COLOR_LOW = 5763719        # Verde
+
+# Limites do Discord: 6000 caracteres e 25 campos por embed, 1024 por valor
+# de campo e 10 embeds por mensagem (margem abaixo dos 6000)
+_EMBED_MAX_CHARS = 5500
+_EMBED_MAX_FIELDS = 25
+_FIELD_MAX_CHARS = 1024
+_MESSAGE_MAX_EMBEDS = 10
+
+
+@st.cache_resource
+def get_webhook_executor():
+    """
+    Pool de threads (compartilhado entre reruns) para envios de webhook em segundo plano.
+    """
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="discord-webhook")
+
+
+class DiscordRateLimiter:
+    """
+    Limitador de taxa para webhooks do Discord (5 envios/1s e 30 envios/60s),
+    ajustado dinamicamente pelos cabeçalhos X-RateLimit-* das respostas.
+    """
+    
+    # (capacidade, janela em segundos)
+    LIMITS = ((5, 1.0), (30, 60.0))
+    
+    def __init__(self):
+        self._buckets = [(capacity, window, deque()) for capacity, window in self.LIMITS]
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """
+        Bloqueia (na thread de envio) até haver capacidade em todas as janelas.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._blocked_until - now
+                for capacity, window, stamps in self._buckets:
+                    while stamps and now - stamps[0] >= window:
+                        stamps.popleft()
+                    if len(stamps) >= capacity:
+                        wait = max(wait, stamps[0] + window - now)
+                if wait <= 0:
+                    for _, _, stamps in self._buckets:
+                        stamps.append(now)
+                    return
+            time.sleep(wait)
+    
+    def update_from_headers(self, headers):
+        """
+        Respeita o limite informado pelo Discord quando não restam envios no bucket.
+        """
+        try:
+            if headers.get('X-RateLimit-Remaining') == '0':
+                reset_after = float(headers.get('X-RateLimit-Reset-After', '0'))
+                with self._lock:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + reset_after)
+        except ValueError:
+            pass
+
+
+@st.cache_resource
+def get_discord_rate_limiter():
+    """
+    Limitador de taxa único por processo (compartilhado entre sessões e reruns).
+    """
+    return DiscordRateLimiter()
+
+
+@st.cache_resource
+def get_http_session():
+    """
+    Sessão HTTP compartilhada entre reruns: reaproveita conexões TLS (keep-alive)
+    e repete falhas transitórias 5xx. O 429 é tratado pelo DiscordRateLimiter.
+    """
+    session = requests.Session()
+    session.headers.update({'User-Agent': 'QA-Log-Agent/1.0'})
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=frozenset(['POST'])
+    )
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry))
+    return session
+
+
+def _post_discord_webhook(webhook_url, payload, limiter, session):
+    """
+    Executa o POST do webhook (chamado fora da thread do script Streamlit),
+    respeitando o limite de taxa e repetindo uma vez após um 429 (Retry-After).
+    """
+    # Serializado uma única vez com orjson (datetime nativo) e reaproveitado na repetição
+    body = orjson.dumps(payload)
+    headers = {'Content-Type': 'application/json'}
+    
+    limiter.acquire()
+    response = session.post(webhook_url, data=body, headers=headers, timeout=10)
+    limiter.update_from_headers(response.headers)
+    
+    if response.status_code == 429:
+        retry_after = float(response.headers.get('Retry-After', '1'))
+        time.sleep(retry_after)
+        limiter.acquire()
+        response = session.post(webhook_url, data=body, headers=headers, timeout=10)
+        limiter.update_from_headers(response.headers)
+    
+    response.raise_for_status()
+    return response
+
+
+def _post_discord_payloads(webhook_url, payloads, limiter, session):
+    """
+    Envia as mensagens em sequência (cada uma com no máximo 10 embeds),
+    passando cada POST pelo limitador de taxa.
+    """
+    response = None
+    for payload in payloads:
+        response = _post_discord_webhook(webhook_url, payload, limiter, session)
+    return response
+
+
+def _chunk_embeds(base_embed, fields, max_chars=_EMBED_MAX_CHARS, max_fields=_EMBED_MAX_FIELDS):
+    """
+    Distribui os campos em embeds dentro dos limites do Discord. O primeiro
+    embed leva título, descrição e rodapé; os seguintes, só a cor e os campos.
+    
+    Returns:
+        list: Embeds prontos para compor as mensagens
+    """
+    used = sum(len(str(base_embed.get(key, ''))) for key in ('title', 'description'))
+    used += len(base_embed.get('footer', {}).get('text', ''))
+    embeds = [dict(base_embed, fields=[])]
+    
+    for field in fields:
+        field = dict(field, value=field['value'][:_FIELD_MAX_CHARS])
+        field_size = len(field['name']) + len(field['value'])
+        current = embeds[-1]
+        if current['fields'] and (len(current['fields']) >= max_fields or used + field_size > max_chars):
+            current = {'color': base_embed.get('color'), 'fields': []}
+            embeds.append(current)
+            used = 0
+        current['fields'].append(field)
+        used += field_size
+    
+    return embeds
+
+
+def _log_webhook_errors(future):
+    """
+    Registra o resultado do envio em segundo plano (sem contexto Streamlit nesta thread).
+    """
+    try:
+        future.result()
+        print("✅ Notificação enviada para Discord")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Erro ao enviar para Discord: {e}")
+    except Exception as e:
+        print(f"❌ Erro inesperado ao enviar para Discord: {e}")
+
+
+def _as_str_list(value) -> list:
+    """Converte causas/recomendações em lista de strings (valor único vira lista de um item)."""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return [str(value)]
+
+
+def _parse_timestamp(value) -> datetime:
+    """Converte o timestamp do resultado em datetime ('agora' se ausente ou inválido)."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            pass
+    return datetime.now()
+
+
+def _shorten(text: str, limit: int) -> str:
+    """Trunca o texto em `limit` caracteres, indicando o corte com '…'."""
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _normalize_result(result: dict) -> dict:
+    """
+    Normaliza um resultado para o esquema usado pela interface (uma única vez,
+    na ingestão): listas sempre listas de str, timestamp sempre datetime,
+    confiança sempre float e severidade em maiúsculas. As versões truncadas
+    exibidas na interface também são calculadas aqui, e não a cada rerun.
+    """
+    try:
+        confidence = float(result.get('confidence_score') or 0.0)
+    except (TypeError, ValueError):
+        confidence = 0.0
+    
+    similar_logs = []
+    for similar in result.get('similar_logs') or []:
+        if isinstance(similar, dict):
+            score = similar.get('similarity_score')
+            content = str(similar.get('content', 'Conteúdo não disponível'))
+        else:
+            score, content = None, str(similar)
+        similar_logs.append({'similarity_score': score, 'content': content, 'preview': _shorten(content, 200)})
+    
+    error_message = str(result.get('error_message', 'Mensagem não disponível'))
+    normalized = dict(result)
+    normalized.update({
+        'error_message': error_message,
+        'short_message': _shorten(error_message, 50),
+        'headline': _shorten(error_message, 80),
+        'explanation': str(result.get('explanation', 'Explicação não disponível.')),
+        'severity': str(result.get('severity') or 'UNKNOWN').upper(),
+        'confidence_score': confidence,
+        'possible_causes': _as_str_list(result.get('possible_causes')),
+        'recommendations': _as_str_list(result.get('recommendations')),
+        'similar_logs': similar_logs,
+        'timestamp': _parse_timestamp(result.get('timestamp'))
+    })
+    return normalized
+
+
+def _ordered_severities(severities) -> list:
+    """
+    Ordena severidades da mais grave para a menos grave (valores fora de _SEVERITY_ORDER ao final).
+    """
+    present = {str(severity) for severity in severities}
+    known = [severity for severity in _SEVERITY_ORDER if severity in present]
+    return known + sorted(present.difference(_SEVERITY_ORDER))
+
+
+def build_results_frame(results):
+    """
+    Monta o DataFrame dos resultados, uma única vez por análise, reutilizado
+    nas métricas, gráficos, filtros e notificações.
+    """
+    df = pd.DataFrame(results)
+    for column in ('severity', 'confidence_score', 'error_message'):
+        if column not in df:
+            df[column] = None
+    # Tipos estreitos: severidade como categoria (códigos int8) e confiança em float32
+    df['severity'] = df['severity'].fillna('UNKNOWN').astype(str).astype('category')
+    df['confidence_score'] = pd.to_numeric(df['confidence_score'], errors='coerce').astype('float32')
+    return df
+
+
+def average_confidence(df) -> float:
+    """Confiança média, ignorando resultados sem pontuação (0 se não houver nenhuma)."""
+    mean = df['confidence_score'].mean()
+    return float(mean) if pd.notna(mean) else 0.0
+
+
+def send_discord_notification(df, analysis_summary=None):
     """
     Envia notificação formatada para Discord via webhook.
     
+    O envio é feito em segundo plano: a função monta o payload, agenda o POST
+    e retorna imediatamente, sem bloquear o rerun do Streamlit.
+    
     Args:
-        results: Lista com resultados da análise
+        df: DataFrame dos resultados da análise (ver build_results_frame)
         analysis_summary: Resumo opcional da análise
     """
     webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
@@ -40,120 +339,108 @@ def send_discord_notification(results, analysis_summary=None):
         st.warning("⚠️ DISCORD_WEBHOOK_URL não configurado no .env")
         return False
     
-    if not results:
+    if df is None or df.empty:
         return False
     
     try:
-        # Conta severidades
-        severity_counts = {}
-        for result in results:
-            severity = result.get('severity', 'UNKNOWN')
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
-        
-        # Calcula confiança média
-        confidence_scores = [r.get('confidence_score', 0) for r in results if r.get('confidence_score') is not None]
-        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
-        
-        # Emojis para severidades
-        severity_emojis = {
-            'CRITICAL': '🔴',
-            'HIGH': '🟠',
-            'MEDIUM': '🟡',
-            'LOW': '🟢',
-            'UNKNOWN': '⚪'
-        }
+        # Conta severidades e calcula confiança média
+        severity_counts = df['severity'].value_counts().to_dict()
+        avg_confidence = average_confidence(df)
         
-        # Cores para embed (hexadecimal)
-        embed_color = 15158332  # Vermelho para crítico
+        # Cor do embed pela severidade mais alta presente
+        embed_color = _EMBED_COLOR_CRITICAL
         if severity_counts.get('CRITICAL', 0) == 0:
             if severity_counts.get('HIGH', 0) > 0:
-                embed_color = 16753920  # Laranja para alto
+                embed_color = _EMBED_COLOR_HIGH
             elif severity_counts.get('MEDIUM', 0) > 0:
-                embed_color = 16776960  # Amarelo para médio
+                embed_color = _EMBED_COLOR_MEDIUM
             else:
-                embed_color = 5763719   # Verde para baixo
+                embed_color = _EMBED_COLOR_LOW
         
         # Monta embed principal
         embed = {
             "title": "🤖 QA Log Agent - Análise Concluída",
-            "description": f"Análise de logs processada com **{len(results)} erros** encontrados",
+            "description": f"Análise de logs processada com **{len(df)} erros** encontrados",
             "color": embed_color,
-            "timestamp": datetime.now().isoformat(),
-            "fields": [
-                {
-                    "name": "📊 Resumo da Análise",
-                    "value": f"**Total de Erros:** {len(results)}\n**Confiança Média:** {avg_confidence:.1%}",
-                    "inline": True
-                }
-            ],
+            "timestamp": datetime.now(),
             "footer": {
                 "text": "QA Log Agent - Edusync",
                 "icon_url": "https://cdn.discordapp.com/attachments/123456789/robot.png"
             }
         }
+        fields = [
+            {
+                "name": "📊 Resumo da Análise",
+                "value": f"**Total de Erros:** {len(df)}\n**Confiança Média:** {avg_confidence:.1%}",
+                "inline": True
+            }
+        ]
         
         # Adiciona campo de severidades se houver erros
         if severity_counts:
-            severity_text = ""
-            for severity, count in severity_counts.items():
-                emoji = severity_emojis.get(severity, '⚪')
-                severity_text += f"{emoji} **{severity}**: {count}\n"
+            severity_text = "\n".join(
+                f"{_SEVERITY_EMOJIS.get(severity, '⚪')} **{severity}**: {count}"
+                for severity, count in severity_counts.items()
+            )
             
-            embed["fields"].append({
+            fields.append({
                 "name": "🎯 Distribuição por Severidade",
-                "value": severity_text.strip(),
+                "value": severity_text,
                 "inline": True
             })
         
-        # Adiciona top 3 erros mais críticos
-        critical_errors = [r for r in results if r.get('severity') in ['CRITICAL', 'HIGH']]
-        critical_errors.sort(key=lambda x: x.get('confidence_score', 0), reverse=True)
+        # Adiciona top 3 erros mais críticos (seleção parcial, sem ordenar tudo)
+        critical_errors = df[df['severity'].isin(('CRITICAL', 'HIGH'))].nlargest(3, 'confidence_score')
         
-        if critical_errors:
-            top_errors_text = ""
-            for i, error in enumerate(critical_errors[:3], 1):
-                severity_emoji = severity_emojis.get(error.get('severity'), '⚪')
-                error_msg = str(error.get('error_message', 'Erro não especificado'))
-                confidence = error.get('confidence_score', 0)
+        if not critical_errors.empty:
+            top_errors = []
+            for i, error in enumerate(critical_errors.itertuples(index=False), 1):
+                severity_emoji = _SEVERITY_EMOJIS.get(error.severity, '⚪')
+                error_msg = error.error_message if isinstance(error.error_message, str) else 'Erro não especificado'
+                confidence = error.confidence_score
                 
                 # Trunca mensagem se muito longa
-                if len(error_msg) > 80:
-                    error_msg = error_msg[:80] + "..."
+                error_msg = _shorten(error_msg, 80)
                 
-                top_errors_text += f"{severity_emoji} **{i}.** {error_msg}\n*Confiança: {confidence:.1%}*\n\n"
+                top_errors.append(f"{severity_emoji} **{i}.** {error_msg}\n*Confiança: {confidence:.1%}*")
             
-            embed["fields"].append({
+            fields.append({
                 "name": "🚨 Top 3 Erros Prioritários",
-                "value": top_errors_text.strip(),
+                "value": "\n\n".join(top_errors),
                 "inline": False
             })
         
         # Adiciona resumo personalizado se fornecido
         if analysis_summary:
-            embed["fields"].append({
+            fields.append({
                 "name": "📝 Resumo da Análise",
                 "value": str(analysis_summary)[:1000],  # Limita tamanho
                 "inline": False
             })
         
-        # Monta payload para Discord
-        payload = {
-            "embeds": [embed],
-            "username": "QA Log Agent",
-            "avatar_url": "https://cdn.discordapp.com/attachments/123456789/robot.png"
-        }
+        # Monta as mensagens para Discord respeitando os limites de embeds
+        embeds = _chunk_embeds(embed, fields)
+        payloads = [
+            {
+                "embeds": embeds[start:start + _MESSAGE_MAX_EMBEDS],
+                "username": "QA Log Agent",
+                "avatar_url": "https://cdn.discordapp.com/attachments/123456789/robot.png"
+            }
+            for start in range(0, len(embeds), _MESSAGE_MAX_EMBEDS)
+        ]
         
-        # Envia para Discord
-        response = requests.post(webhook_url, json=payload, timeout=10)
-        response.raise_for_status()
+        # Agenda o envio para Discord; falhas são registradas pelo callback
+        # Limitador e sessão são obtidos aqui, na thread do script, e repassados à thread de envio
+        future = get_webhook_executor().submit(
+            _post_discord_payloads, webhook_url, payloads,
+            get_discord_rate_limiter(), get_http_session()
+        )
+        future.add_done_callback(_log_webhook_errors)
         
         return True
         
-    except requests.exceptions.RequestException as e:
-        st.error(f"❌ Erro ao enviar para Discord: {e}")
-        return False
     except Exception as e:
-        st.error(f"❌ Erro inesperado ao enviar para Discord: {e}")
+        st.error(f"❌ Erro inesperado ao preparar notificação para Discord: {e}")
         return False
 
 # Configuração da página
@@ -165,7 +452,8 @@ st.set_page_config(
 )
 
 # CSS customizado para seguir identidade visual Edusync
-st.markdown("""
+# (regras comuns aos cards agrupadas; injetado por inject_css() a cada execução)
+_CSS = """
 <style>
     .main-header {
         background: linear-gradient(90deg, #1e3a8a 0%, #3b82f6 100%);
@@ -176,83 +464,59 @@ st.markdown("""
         margin-bottom: 2rem;
     }
     
-    .metric-card {
-        background: #f8fafc !important;
-        background-color: #f8fafc !important;
+    /* Cards de métricas: st.metric dentro de containers com key (classe .st-key-<key>) */
+    .st-key-metric_total, .st-key-metric_critical, .st-key-metric_high, .st-key-metric_confidence {
         padding: 1.5rem !important;
         border-radius: 12px !important;
-        border-left: 5px solid #3b82f6 !important;
         margin: 0.5rem 0 !important;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1) !important;
-        border: 1px solid #e2e8f0 !important;
         opacity: 1 !important;
+        transition: all 0.3s ease !important;
     }
     
-    .metric-card h3 {
-        color: #1e293b !important;
+    .st-key-metric_total [data-testid="stMetricLabel"] p,
+    .st-key-metric_critical [data-testid="stMetricLabel"] p,
+    .st-key-metric_high [data-testid="stMetricLabel"] p,
+    .st-key-metric_confidence [data-testid="stMetricLabel"] p {
         font-size: 1rem !important;
         font-weight: 600 !important;
-        margin: 0 0 0.5rem 0 !important;
     }
     
-    .metric-card h2 {
-        color: #3b82f6 !important;
+    .st-key-metric_total [data-testid="stMetricValue"],
+    .st-key-metric_critical [data-testid="stMetricValue"],
+    .st-key-metric_high [data-testid="stMetricValue"],
+    .st-key-metric_confidence [data-testid="stMetricValue"] {
         font-size: 2rem !important;
         font-weight: 700 !important;
-        margin: 0 !important;
     }
     
-    .error-card {
+    .st-key-metric_total {
+        background: #f8fafc !important;
+        border-left: 5px solid #3b82f6 !important;
+        box-shadow: 0 2px 8px rgba(0,0,0,0.1) !important;
+        border: 1px solid #e2e8f0 !important;
+    }
+    .st-key-metric_total [data-testid="stMetricLabel"] p { color: #1e293b !important; }
+    .st-key-metric_total [data-testid="stMetricValue"] { color: #3b82f6 !important; }
+    
+    .st-key-metric_critical, .st-key-metric_high {
         background: #fef2f2 !important;
-        background-color: #fef2f2 !important;
-        padding: 1.5rem !important;
-        border-radius: 12px !important;
         border-left: 5px solid #ef4444 !important;
-        margin: 0.5rem 0 !important;
         box-shadow: 0 2px 8px rgba(239,68,68,0.1) !important;
         border: 1px solid #fecaca !important;
-        opacity: 1 !important;
-    }
-    
-    .error-card h3 {
-        color: #7f1d1d !important;
-        font-size: 1rem !important;
-        font-weight: 600 !important;
-        margin: 0 0 0.5rem 0 !important;
-    }
-    
-    .error-card h2 {
-        color: #ef4444 !important;
-        font-size: 2rem !important;
-        font-weight: 700 !important;
-        margin: 0 !important;
     }
+    .st-key-metric_critical [data-testid="stMetricLabel"] p,
+    .st-key-metric_high [data-testid="stMetricLabel"] p { color: #7f1d1d !important; }
+    .st-key-metric_critical [data-testid="stMetricValue"],
+    .st-key-metric_high [data-testid="stMetricValue"] { color: #ef4444 !important; }
     
-    .success-card {
+    .st-key-metric_confidence {
         background: #f0fdf4 !important;
-        background-color: #f0fdf4 !important;
-        padding: 1.5rem !important;
-        border-radius: 12px !important;
         border-left: 5px solid #22c55e !important;
-        margin: 0.5rem 0 !important;
         box-shadow: 0 2px 8px rgba(34,197,94,0.1) !important;
         border: 1px solid #bbf7d0 !important;
-        opacity: 1 !important;
-    }
-    
-    .success-card h3 {
-        color: #14532d !important;
-        font-size: 1rem !important;
-        font-weight: 600 !important;
-        margin: 0 0 0.5rem 0 !important;
-    }
-    
-    .success-card h2 {
-        color: #22c55e !important;
-        font-size: 2rem !important;
-        font-weight: 700 !important;
-        margin: 0 !important;
     }
+    .st-key-metric_confidence [data-testid="stMetricLabel"] p { color: #14532d !important; }
+    .st-key-metric_confidence [data-testid="stMetricValue"] { color: #22c55e !important; }
     
     .sidebar .sidebar-content {
         background: #1e293b;
@@ -263,46 +527,194 @@ st.markdown("""
         opacity: 1 !important;
     }
     
-    /* Adiciona transição suave */
-    .metric-card, .error-card, .success-card {
-        transition: all 0.3s ease !important;
-    }
-    
-    .metric-card:hover, .error-card:hover, .success-card:hover {
+    .st-key-metric_total:hover, .st-key-metric_critical:hover,
+    .st-key-metric_high:hover, .st-key-metric_confidence:hover {
         transform: translateY(-2px) !important;
         box-shadow: 0 4px 16px rgba(0,0,0,0.15) !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+def inject_css():
+    """
+    Injeta o CSS da aplicação. O Streamlit remove da página os elementos não
+    reemitidos no rerun, então a injeção acontece em toda execução, com a
+    folha de estilo já montada como constante do módulo.
+    """
+    st.markdown(_CSS, unsafe_allow_html=True)
 
 
 def initialize_session_state():
     """Inicializa variáveis de sessão."""
-    if 'agent' not in st.session_state:
-        st.session_state.agent = None
     if 'analysis_results' not in st.session_state:
         st.session_state.analysis_results = []
-    if 'log_content' not in st.session_state:
-        st.session_state.log_content = ""
+    if 'analysis_df' not in st.session_state:
+        st.session_state.analysis_df = None
+    if 'analysis_key' not in st.session_state:
+        st.session_state.analysis_key = ""
 
 
-def setup_agent():
-    """Configura o agente de análise."""
+@st.cache_resource(show_spinner="Inicializando agente...")
+def setup_agent(model_name: str = "gpt-4o-mini"):
+    """
+    Configura o agente de análise: uma instância por modelo, compartilhada
+    entre sessões e reruns (banco vetorial e clientes abertos uma única vez).
+    
+    Falhas levantam exceção em vez de retornar None: o st.cache_resource não
+    guarda exceções, então a próxima tentativa (ex.: após configurar a chave)
+    cria o agente normalmente.
+    """
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
-        st.error("🔑 OPENAI_API_KEY não configurada. Verifique as variáveis de ambiente.")
-        return None
+        raise RuntimeError("🔑 OPENAI_API_KEY não configurada. Verifique as variáveis de ambiente.")
+    
+    # Uploads avulsos geram coleções pequenas: busca exata por padrão (QA_VSTORE sobrescreve).
+    # O cache persistente por chunk (o mesmo da CLI) reaproveita análises entre reinícios do app
+    return LogAnalyzerAgent(
+        openai_api_key=api_key,
+        vectorstore_path="./vectorstore",
+        model_name=model_name,
+        vector_backend=os.getenv('QA_VSTORE', 'faiss-flat'),
+        result_cache=ResultCache(os.path.join("./vectorstore", "llm_cache"))
+    )
+
+
+@st.cache_data(ttl=24 * 60 * 60, show_spinner=False)
+def _cached_analyze(content_hash: str, model_name: str, _load_content, _progress=None):
+    """
+    Analisa o conteúdo do log, memorizando o resultado por hash do conteúdo e
+    modelo (o conteúdo em si não entra na chave): reenvios do mesmo arquivo
+    retornam na hora, sem novas chamadas ao LLM.
+    
+    Falhas nunca entram no cache: se o pipeline falhar ou algum erro voltar com
+    resposta de falha (limite de taxa, timeout, JSON inválido), a função levanta
+    exceção e o próximo envio do arquivo repete a análise.
+    
+    Args:
+        _load_content: Função que decodifica o log (chamada apenas quando não há cache)
+        _progress: Callback opcional (analisados, total) chamado a cada resultado
+    """
+    agent = setup_agent(model_name)
+    _content = _load_content()
+    
+    # O conteúdo vai direto para o agente, sem arquivo temporário em disco
+    if _progress is None:
+        results = agent.process_log_content(_content, raise_on_error=True)
+    else:
+        # Total de erros para o progresso: só os cabeçalhos são varridos, sem parsing completo
+        total = agent.preprocessor.count_error_entries(_content)
+        _progress(0, total)
+        
+        results = []
+        for result in agent.iter_log_content(_content, raise_on_error=True):
+            results.append(result)
+            _progress(len(results), total)
+    
+    failures = sum(1 for result in results if 'error_details' in result or 'raw_response' in result)
+    if failures:
+        raise RuntimeError(f"{failures} de {len(results)} erros não puderam ser analisados; tente novamente")
+    return results
+
+
+def _run_analysis_job(content_hash: str, model_name: str, load_content, progress_queue: queue.Queue):
+    """
+    Executa a análise em uma thread própria, publicando mensagens de progresso
+    ({type, stage, pct}) na fila até a mensagem final 'done' ou 'error'.
+    """
+    progress_calls = []
+    
+    def report(done, total):
+        progress_calls.append(done)
+        pct = 5 + int(95 * done / total) if total else 99
+        progress_queue.put({'type': 'progress', 'stage': f"Analisando erros ({done}/{total})", 'pct': min(pct, 99)})
     
     try:
-        agent = LogAnalyzerAgent(
-            openai_api_key=api_key,
-            vectorstore_path="./vectorstore",
-            model_name="gpt-4o-mini"
-        )
-        return agent
+        progress_queue.put({'type': 'progress', 'stage': "Pré-processando log", 'pct': 0})
+        results = _cached_analyze(content_hash, model_name, load_content, _progress=report)
+        # Sem nenhuma chamada de progresso, o resultado veio direto do st.cache_data
+        progress_queue.put({
+            'type': 'done', 'stage': "Análise concluída", 'pct': 100,
+            'payload': results, 'cached': not progress_calls
+        })
     except Exception as e:
-        st.error(f"❌ Erro ao inicializar agente: {e}")
-        return None
+        progress_queue.put({'type': 'error', 'stage': "Falha na análise", 'pct': 100, 'payload': e})
+
+
+def run_analysis_with_progress(content_hash: str, model_name: str, load_content, poll_interval: float = 1.0):
+    """
+    Roda a análise em segundo plano e acompanha o progresso com uma barra,
+    em vez de um spinner estático.
+    
+    Não há limite de tempo: os resultados chegam por lote do pipeline e a
+    thread de análise sempre encerra com uma mensagem 'done' ou 'error'.
+    
+    Args:
+        poll_interval (float): Segundos entre verificações de que a thread segue ativa
+    """
+    progress_queue = queue.Queue()
+    worker = threading.Thread(
+        target=_run_analysis_job,
+        args=(content_hash, model_name, load_content, progress_queue),
+        daemon=True
+    )
+    # Contexto do script para que st.cache_* funcione dentro da thread
+    add_script_run_ctx(worker)
+    worker.start()
+    
+    bar = st.progress(0, text="🔄 Iniciando análise...")
+    try:
+        while True:
+            try:
+                message = progress_queue.get(timeout=poll_interval)
+            except queue.Empty:
+                # Só desiste se a thread morreu sem publicar a mensagem final
+                if worker.is_alive() or not progress_queue.empty():
+                    continue
+                raise RuntimeError("A análise foi interrompida sem retornar resultado")
+            
+            if message['type'] == 'error':
+                raise message['payload']
+            bar.progress(message['pct'], text=f"🔄 {message['stage']}")
+            if message['type'] == 'done':
+                if message.get('cached'):
+                    st.info("♻️ Arquivo já analisado: resultado reaproveitado do cache.")
+                return message['payload']
+    finally:
+        bar.empty()
+
+
+def read_uploaded_text(uploaded_file, chunk_size: int = 1 << 20) -> str:
+    """
+    Decodifica o arquivo enviado em blocos (sem a cópia intermediária de
+    getvalue() em bytes), substituindo sequências UTF-8 inválidas.
+    """
+    uploaded_file.seek(0)
+    text_stream = TextIOWrapper(uploaded_file, encoding='utf-8', errors='replace')
+    try:
+        return ''.join(iter(lambda: text_stream.read(chunk_size), ''))
+    finally:
+        # Desacopla o wrapper para que ele não feche o arquivo enviado
+        text_stream.detach()
+
+
+def hash_uploaded_file(uploaded_file) -> str:
+    """
+    SHA-256 dos bytes enviados, calculado sobre o buffer do upload (sem cópia nem decodificação).
+    """
+    with uploaded_file.getbuffer() as buffer:
+        return hashlib.sha256(buffer).hexdigest()
+
+
+def preview_uploaded_file(uploaded_file, limit: int = 1000) -> str:
+    """
+    Decodifica apenas o início do arquivo enviado para a pré-visualização.
+    """
+    uploaded_file.seek(0)
+    head = uploaded_file.read(limit + 1)
+    uploaded_file.seek(0)
+    preview = head[:limit].decode('utf-8', errors='ignore')
+    return preview + "..." if len(head) > limit else preview
 
 
 def display_header():
@@ -315,79 +727,39 @@ def display_header():
     """, unsafe_allow_html=True)
 
 
-def display_metrics(results):
+def display_metrics(df):
     """Exibe métricas da análise."""
-    if not results:
+    if df.empty:
         return
     
+    severity_counts = df['severity'].value_counts()
     col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        st.markdown("""
-        <div class="metric-card">
-            <h3>📊 Total de Erros</h3>
-            <h2>{}</h2>
-        </div>
-        """.format(len(results)), unsafe_allow_html=True)
-    
-    with col2:
-        # CORRIGIDO: Acesso por chave de dicionário
-        critical_count = sum(1 for r in results if r.get('severity') == 'CRITICAL')
-        st.markdown("""
-        <div class="error-card">
-            <h3>🔴 Críticos</h3>
-            <h2>{}</h2>
-        </div>
-        """.format(critical_count), unsafe_allow_html=True)
-    
-    with col3:
-        # CORRIGIDO: Acesso por chave de dicionário
-        high_count = sum(1 for r in results if r.get('severity') == 'HIGH')
-        st.markdown("""
-        <div class="error-card">
-            <h3>🟠 Alta Prioridade</h3>
-            <h2>{}</h2>
-        </div>
-        """.format(high_count), unsafe_allow_html=True)
-    
-    with col4:
-        # CORRIGIDO: Acesso por chave de dicionário e tratamento de divisão por zero
-        confidence_scores = [r.get('confidence_score', 0) for r in results if r.get('confidence_score') is not None]
-        avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
-        st.markdown("""
-        <div class="success-card">
-            <h3>🎯 Confiança Média</h3>
-            <h2>{:.1%}</h2>
-        </div>
-        """.format(avg_confidence), unsafe_allow_html=True)
+    # Componentes nativos; o visual dos cards vem do CSS (.st-key-metric_*)
+    col1.container(key="metric_total").metric("📊 Total de Erros", df.shape[0])
+    col2.container(key="metric_critical").metric(
+        f"{_SEVERITY_EMOJIS['CRITICAL']} Críticos", int(severity_counts.get('CRITICAL', 0))
+    )
+    col3.container(key="metric_high").metric(
+        f"{_SEVERITY_EMOJIS['HIGH']} Alta Prioridade", int(severity_counts.get('HIGH', 0))
+    )
+    col4.container(key="metric_confidence").metric(
+        "🎯 Confiança Média", f"{average_confidence(df):.1%}"
+    )
 
 
-def display_severity_chart(results):
-    """Exibe gráfico de distribuição por severidade."""
-    if not results:
-        return
-    
-    # CORRIGIDO: Acesso por chave de dicionário
-    severity_counts = {}
-    for result in results:
-        severity = result.get('severity', 'UNKNOWN')
-        severity_counts[severity] = severity_counts.get(severity, 0) + 1
-    
-    df = pd.DataFrame(list(severity_counts.items()), columns=['Severidade', 'Quantidade'])
-    
-    # Cores personalizadas
-    color_map = {
-        'CRITICAL': '#ef4444',
-        'HIGH': '#f97316', 
-        'MEDIUM': '#eab308',
-        'LOW': '#22c55e',
-        'UNKNOWN': '#6b7280'
-    }
+@st.cache_data(show_spinner=False)
+def _build_severity_fig(severity_pairs: tuple):
+    """
+    Monta (e memoriza) o gráfico de pizza a partir dos pares (severidade, quantidade).
+    """
+    names = [severity for severity, _ in severity_pairs]
+    values = [count for _, count in severity_pairs]
     
-    fig = px.pie(df, values='Quantidade', names='Severidade',
+    fig = px.pie(values=values, names=names,
                  title="Distribuição de Erros por Severidade",
-                 color='Severidade',
-                 color_discrete_map=color_map)
+                 color=names,
+                 color_discrete_map=_SEVERITY_COLORS)
     
     fig.update_layout(
         font=dict(size=14),
@@ -395,51 +767,54 @@ def display_severity_chart(results):
         showlegend=True
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
-def display_timeline_chart(results):
-    """Exibe gráfico de timeline dos erros."""
-    if not results:
+def display_severity_chart(df):
+    """Exibe gráfico de distribuição por severidade."""
+    if df.empty:
         return
     
-    # Prepara dados para timeline
-    timeline_data = []
-    for result in results:
-        # CORRIGIDO: Acesso por chave de dicionário e tratamento de timestamp
-        timestamp = result.get('timestamp')
-        if isinstance(timestamp, str):
-            try:
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            except:
-                timestamp = datetime.now()
-        elif not isinstance(timestamp, datetime):
-            timestamp = datetime.now()
-            
-        timeline_data.append({
-            'timestamp': timestamp,
-            'severity': result.get('severity', 'UNKNOWN'),
-            'message': str(result.get('error_message', ''))[:50] + "..."
-        })
-    
-    df = pd.DataFrame(timeline_data)
+    # Pares na ordem fixa de severidade: mesma chave de cache e mesma legenda entre reruns
+    severity_counts = df['severity'].value_counts()
+    severity_pairs = tuple(
+        (severity, int(severity_counts[severity]))
+        for severity in _ordered_severities(severity_counts.index)
+        if severity_counts[severity] > 0
+    )
+    # Chave estável: o front-end atualiza o gráfico existente em vez de recriá-lo
+    st.plotly_chart(_build_severity_fig(severity_pairs), use_container_width=True,
+                    key="severity_chart", config=_PLOTLY_CONFIG)
+
+
+@st.cache_data(show_spinner=False)
+def _build_timeline_fig(results_key: str, _results):
+    """
+    Monta (e memoriza pela chave da análise) o gráfico de timeline; None se não houver dados.
+    """
+    df = pd.DataFrame(_results)
     
     # Verifica se há dados para plotar
     if df.empty:
-        st.info("📊 Não há dados suficientes para o gráfico de timeline.")
-        return
+        return None
+    
+    # Prepara dados para timeline (parsing vetorizado; inválidos/ausentes viram "agora")
+    for column in ('timestamp', 'severity', 'error_message'):
+        if column not in df:
+            df[column] = None
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce', utc=True, format='ISO8601')
+    df['timestamp'] = df['timestamp'].fillna(pd.Timestamp.now().tz_localize('UTC'))
+    df['severity'] = df['severity'].fillna('UNKNOWN')
+    if 'short_message' in df:
+        df['message'] = df['short_message']
+    else:
+        df['message'] = df['error_message'].fillna('').astype(str).map(lambda text: _shorten(text, 50))
     
     fig = px.scatter(df, x='timestamp', y='severity', 
                      hover_data=['message'],
                      title="Timeline de Erros",
                      color='severity',
-                     color_discrete_map={
-                         'CRITICAL': '#ef4444',
-                         'HIGH': '#f97316',
-                         'MEDIUM': '#eab308', 
-                         'LOW': '#22c55e',
-                         'UNKNOWN': '#6b7280'
-                     })
+                     color_discrete_map=_SEVERITY_COLORS)
     
     fig.update_layout(
         xaxis_title="Timestamp",
@@ -448,11 +823,30 @@ def display_timeline_chart(results):
         title_font_size=18
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 
-def display_analysis_results(results):
-    """Exibe resultados detalhados da análise."""
+def display_timeline_chart(results, results_key: str):
+    """Exibe gráfico de timeline dos erros."""
+    if not results:
+        return
+    
+    fig = _build_timeline_fig(results_key, results)
+    if fig is None:
+        st.info("📊 Não há dados suficientes para o gráfico de timeline.")
+        return
+    
+    st.plotly_chart(fig, use_container_width=True, key="timeline_chart", config=_PLOTLY_CONFIG)
+
+
+@st.fragment
+def display_analysis_results(results, df):
+    """
+    Exibe resultados detalhados da análise.
+    
+    Executado como fragmento: mudanças nos filtros reexecutam só esta seção,
+    sem refazer cabeçalho, métricas, gráficos e relatório.
+    """
     if not results:
         st.info("📝 Nenhum resultado de análise disponível.")
         return
@@ -462,8 +856,7 @@ def display_analysis_results(results):
     # Filtros
     col1, col2 = st.columns(2)
     with col1:
-        # CORRIGIDO: Acesso por chave de dicionário
-        severities = list(set(r.get('severity', 'UNKNOWN') for r in results))
+        severities = _ordered_severities(df['severity'].unique())
         severity_filter = st.selectbox(
             "Filtrar por Severidade:",
             ["Todos"] + severities
@@ -475,78 +868,91 @@ def display_analysis_results(results):
             0.0, 1.0, 0.0, 0.1
         )
     
-    # Aplica filtros
-    filtered_results = results
+    # Aplica filtros sobre as colunas do DataFrame (posições alinhadas a `results`)
+    mask = df['confidence_score'].fillna(0) >= confidence_filter
     if severity_filter != "Todos":
-        filtered_results = [r for r in filtered_results if r.get('severity') == severity_filter]
+        mask &= df['severity'] == severity_filter
+    positions = mask.to_numpy().nonzero()[0]
     
-    # CORRIGIDO: Acesso por chave de dicionário
-    filtered_results = [r for r in filtered_results if r.get('confidence_score', 0) >= confidence_filter]
+    # Paginação: só a página atual é renderizada (widgets constantes por rerun)
+    total_pages = max(1, -(-len(positions) // RESULTS_PAGE_SIZE))
+    page = 0
+    if total_pages > 1:
+        page = st.number_input("Página", min_value=1, max_value=total_pages, value=1) - 1
+        st.caption(f"{len(positions)} resultados · página {page + 1} de {total_pages}")
+    start = page * RESULTS_PAGE_SIZE
+    page_results = [results[pos] for pos in positions[start:start + RESULTS_PAGE_SIZE]]
     
     # Exibe resultados
-    for i, result in enumerate(filtered_results):
-        error_message = str(result.get('error_message', 'Mensagem não disponível'))
-        with st.expander(f"🔍 Erro {i+1}: {error_message[:80]}..."):
+    for i, result in enumerate(page_results, start):
+        # Resultados já normalizados na ingestão (ver _normalize_result)
+        with st.expander(f"🔍 Erro {i+1}: {result['headline']}"):
             
             # Informações básicas
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Severidade", result.get('severity', 'UNKNOWN'))
+                st.metric("Severidade", result['severity'])
             with col2:
-                confidence = result.get('confidence_score', 0)
-                st.metric("Confiança", f"{confidence:.1%}")
+                st.metric("Confiança", f"{result['confidence_score']:.1%}")
             with col3:
-                # CORRIGIDO: Campo similar_logs pode não existir
-                similar_count = len(result.get('similar_logs', []))
-                st.metric("Logs Similares", similar_count)
+                st.metric("Logs Similares", len(result['similar_logs']))
             
             # Explicação
             st.subheader("💡 Explicação")
-            explanation = result.get('explanation', 'Explicação não disponível.')
-            st.write(explanation)
+            st.write(result['explanation'])
             
             # Possíveis causas
             st.subheader("🔍 Possíveis Causas")
-            possible_causes = result.get('possible_causes', [])
-            if isinstance(possible_causes, list):
-                for j, cause in enumerate(possible_causes, 1):
-                    st.write(f"{j}. {cause}")
-            else:
-                st.write(f"1. {possible_causes}")
+            for j, cause in enumerate(result['possible_causes'], 1):
+                st.write(f"{j}. {cause}")
             
             # Recomendações
             st.subheader("🛠️ Recomendações")
-            recommendations = result.get('recommendations', [])
-            if isinstance(recommendations, list):
-                for j, rec in enumerate(recommendations, 1):
-                    st.write(f"{j}. {rec}")
-            else:
-                st.write(f"1. {recommendations}")
+            for j, rec in enumerate(result['recommendations'], 1):
+                st.write(f"{j}. {rec}")
             
             # Logs similares (se existirem)
-            similar_logs = result.get('similar_logs', [])
+            similar_logs = result['similar_logs']
             if similar_logs:
                 st.subheader("📚 Logs Similares")
                 for j, similar in enumerate(similar_logs[:3], 1):
-                    if isinstance(similar, dict):
-                        similarity_score = similar.get('similarity_score', 0)
-                        content = similar.get('content', 'Conteúdo não disponível')
-                        st.text_area(
-                            f"Similar {j} (Score: {similarity_score:.3f})",
-                            content[:200] + "...",
-                            height=100
-                        )
-                    else:
-                        st.text_area(
-                            f"Similar {j}",
-                            str(similar)[:200] + "...",
-                            height=100
-                        )
+                    score = similar['similarity_score']
+                    label = f"Similar {j} (Score: {score:.3f})" if score is not None else f"Similar {j}"
+                    st.caption(label)
+                    st.code(similar['preview'], language=None)
+
+
+@st.cache_data(show_spinner=False)
+def _build_report(results_key: str, _results):
+    """
+    Monta os relatórios CSV e JSON para download, memorizados pela chave da
+    análise (os resultados em si não são hasheados): reruns que não alteram
+    a análise reaproveitam os bytes já serializados.
+    
+    Returns:
+        Tuple[bytes, bytes]: Conteúdo CSV e JSON do relatório
+    """
+    # Montagem por colunas: o DataFrame recebe listas prontas, sem inferência linha a linha
+    columns = {
+        'timestamp': [result['timestamp'].isoformat() for result in _results],
+        'error_message': [result['error_message'] for result in _results],
+        'explanation': [result['explanation'] for result in _results],
+        'severity': [result['severity'] for result in _results],
+        'confidence_score': [result['confidence_score'] for result in _results],
+        'possible_causes': ['; '.join(result['possible_causes']) for result in _results],
+        'recommendations': ['; '.join(result['recommendations']) for result in _results]
+    }
+    
+    csv_bytes = pd.DataFrame(columns).to_csv(index=False).encode('utf-8')
+    records = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    json_bytes = orjson.dumps(records, default=str, option=orjson.OPT_INDENT_2)
+    return csv_bytes, json_bytes
 
 
 def main():
     """Função principal da aplicação Streamlit."""
     initialize_session_state()
+    inject_css()
     display_header()
     
     # Sidebar
@@ -585,147 +991,104 @@ def main():
     
     # Área principal
     if uploaded_file is not None:
-        # Lê conteúdo do arquivo
+        # Mostra preview do arquivo (só o início é decodificado; o log completo,
+        # apenas quando a análise precisar dele)
         try:
-            stringio = StringIO(uploaded_file.getvalue().decode("utf-8"))
-            log_content = stringio.read()
-            st.session_state.log_content = log_content
-            
-            # Mostra preview do arquivo
             with st.expander("👀 Preview do Arquivo"):
-                preview_content = log_content[:1000] + "..." if len(log_content) > 1000 else log_content
-                st.text_area("Conteúdo:", preview_content, height=200)
+                st.text_area("Conteúdo:", preview_uploaded_file(uploaded_file), height=200)
         except Exception as e:
             st.error(f"❌ Erro ao ler arquivo: {e}")
     
     # Executa análise
     if analyze_button and uploaded_file is not None:
-        if not st.session_state.log_content:
+        if uploaded_file.size == 0:
             st.error("❌ Nenhum conteúdo de log encontrado. Faça upload de um arquivo válido.")
             st.stop()
             
-        with st.spinner("🔄 Analisando logs... Isso pode levar alguns minutos."):
+        try:
+            # Inicializa agente (uma vez por modelo; erros de configuração interrompem aqui)
+            try:
+                setup_agent(model_choice)
+            except Exception as e:
+                st.error(f"❌ Erro ao inicializar agente: {e}")
+                st.stop()
             
-            # Salva arquivo temporário
-            temp_file = f"temp_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+            # Processa o conteúdo (memorizado por hash: o mesmo arquivo não é reanalisado)
+            content_hash = hash_uploaded_file(uploaded_file)
+            results = [
+                _normalize_result(result)
+                for result in run_analysis_with_progress(
+                    content_hash, model_choice, lambda: read_uploaded_text(uploaded_file)
+                )
+            ]
+            st.session_state.analysis_results = results
+            st.session_state.analysis_key = f"{model_choice}:{content_hash}"
+            st.session_state.analysis_df = build_results_frame(results)
             
-            try:
-                with open(temp_file, 'w', encoding='utf-8') as f:
-                    f.write(st.session_state.log_content)
+            if results:
+                st.success(f"✅ Análise concluída! {len(results)} erros analisados.")
                 
-                # Inicializa agente
-                agent = setup_agent()
-                if agent is None:
-                    st.stop()
-                
-                # Processa arquivo
-                results = agent.process_log_file(temp_file)
-                st.session_state.analysis_results = results
-                
-                # Remove arquivo temporário
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                
-                if results:
-                    st.success(f"✅ Análise concluída! {len(results)} erros analisados.")
-                    
-                    # Envia para Discord se configurado
-                    if send_alerts:
-                        with st.spinner("📤 Enviando notificação para Discord..."):
-                            success = send_discord_notification(
-                                results=results,
-                                analysis_summary=f"Análise automática de logs concluída. {len(results)} erros identificados no arquivo {uploaded_file.name}."
-                            )
-                            if success:
-                                st.success("✅ Notificação enviada para Discord com sucesso!")
-                            else:
-                                st.error("❌ Falha ao enviar notificação para Discord.")
-                else:
-                    st.warning("⚠️ Análise concluída, mas nenhum erro foi encontrado no arquivo.")
-                    
-                    # Envia notificação mesmo sem erros se configurado
-                    if send_alerts:
-                        with st.spinner("📤 Enviando notificação para Discord..."):
-                            # Cria um resultado fictício para indicar que não há erros
-                            no_errors_result = [{
-                                'severity': 'INFO',
-                                'error_message': 'Nenhum erro encontrado no arquivo de log',
-                                'confidence_score': 1.0,
-                                'timestamp': datetime.now()
-                            }]
-                            success = send_discord_notification(
-                                results=no_errors_result,
-                                analysis_summary=f"Análise de logs concluída sem erros encontrados no arquivo {uploaded_file.name}. ✅"
-                            )
-                            if success:
-                                st.success("✅ Notificação enviada para Discord com sucesso!")
+                # Envia para Discord se configurado
+                if send_alerts:
+                    success = send_discord_notification(
+                        st.session_state.analysis_df,
+                        analysis_summary=f"Análise automática de logs concluída. {len(results)} erros identificados no arquivo {uploaded_file.name}."
+                    )
+                    if success:
+                        st.success("📤 Notificação para Discord enviada em segundo plano.")
+                    else:
+                        st.error("❌ Falha ao enviar notificação para Discord.")
+            else:
+                st.warning("⚠️ Análise concluída, mas nenhum erro foi encontrado no arquivo.")
                 
-            except Exception as e:
-                st.error(f"❌ Erro durante análise: {e}")
-                st.exception(e)  # Para debug
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
+                # Envia notificação mesmo sem erros se configurado
+                if send_alerts:
+                    # Cria um resultado fictício para indicar que não há erros
+                    no_errors_result = [{
+                        'severity': 'INFO',
+                        'error_message': 'Nenhum erro encontrado no arquivo de log',
+                        'confidence_score': 1.0,
+                        'timestamp': datetime.now()
+                    }]
+                    success = send_discord_notification(
+                        build_results_frame(no_errors_result),
+                        analysis_summary=f"Análise de logs concluída sem erros encontrados no arquivo {uploaded_file.name}. ✅"
+                    )
+                    if success:
+                        st.success("📤 Notificação para Discord enviada em segundo plano.")
+            
+        except Exception as e:
+            st.error(f"❌ Erro durante análise: {e}")
+            st.exception(e)  # Para debug
     
     # Exibe resultados
     if st.session_state.analysis_results:
         results = st.session_state.analysis_results
+        df = st.session_state.analysis_df
+        if df is None:
+            df = st.session_state.analysis_df = build_results_frame(results)
         
         # Métricas
-        display_metrics(results)
+        display_metrics(df)
         
         # Gráficos
         col1, col2 = st.columns(2)
         with col1:
-            display_severity_chart(results)
+            display_severity_chart(df)
         with col2:
-            display_timeline_chart(results)
+            display_timeline_chart(results, st.session_state.analysis_key)
         
         # Resultados detalhados
-        display_analysis_results(results)
+        display_analysis_results(results, df)
         
         # Download de relatório
         st.subheader("📥 Download do Relatório")
         
-        # Prepara dados para download
-        report_data = []
-        for result in results:
-            # CORRIGIDO: Tratamento seguro de timestamp
-            timestamp = result.get('timestamp')
-            if isinstance(timestamp, str):
-                timestamp_str = timestamp
-            elif isinstance(timestamp, datetime):
-                timestamp_str = timestamp.isoformat()
-            else:
-                timestamp_str = datetime.now().isoformat()
-            
-            # CORRIGIDO: Tratamento seguro de listas
-            possible_causes = result.get('possible_causes', [])
-            if isinstance(possible_causes, list):
-                causes_str = '; '.join(str(cause) for cause in possible_causes)
-            else:
-                causes_str = str(possible_causes)
-            
-            recommendations = result.get('recommendations', [])
-            if isinstance(recommendations, list):
-                recommendations_str = '; '.join(str(rec) for rec in recommendations)
-            else:
-                recommendations_str = str(recommendations)
-            
-            report_data.append({
-                'timestamp': timestamp_str,
-                'error_message': str(result.get('error_message', '')),
-                'explanation': str(result.get('explanation', '')),
-                'severity': str(result.get('severity', 'UNKNOWN')),
-                'confidence_score': float(result.get('confidence_score', 0)),
-                'possible_causes': causes_str,
-                'recommendations': recommendations_str
-            })
-        
-        df_report = pd.DataFrame(report_data)
+        # Relatório montado uma vez por análise (memorizado pela chave dos resultados)
+        csv, json_data = _build_report(st.session_state.analysis_key, results)
         
         col1, col2 = st.columns(2)
         with col1:
-            csv = df_report.to_csv(index=False)
             st.download_button(
                 label="📊 Download CSV",
                 data=csv,
@@ -734,7 +1097,6 @@ def main():
             )
         
         with col2:
-            json_data = json.dumps(report_data, indent=2, ensure_ascii=False, default=str)
             st.download_button(
                 label="📋 Download JSON",
                 data=json_data,
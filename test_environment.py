@@ -9,10 +9,20 @@ e testa as funcionalidades principais do agente.
 import os
 import sys
 import json
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from importlib.metadata import distribution, PackageNotFoundError
 from typing import List, Dict, Tuple
 
+# orjson é opcional aqui: o teste de ambiente precisa rodar mesmo sem as dependências instaladas
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class EnvironmentTester:
     """Classe para testar o ambiente do QA Log Agent."""
@@ -21,6 +31,12 @@ class EnvironmentTester:
         self.tests_passed = 0
         self.tests_failed = 0
         self.test_results = []
+        # Protege contadores, resultados e saída quando testes rodam em paralelo
+        self._lock = threading.Lock()
+        # Linhas de detalhe do teste em execução em cada thread, impressas junto com o resultado
+        self._details = threading.local()
+        # Criado só ao salvar, para não mascarar a verificação da estrutura de diretórios
+        self.output_dir = Path('output')
 
     def print_header(self):
         """Imprime cabeçalho do teste."""
@@ -38,37 +54,53 @@ class EnvironmentTester:
             print(f"   {message}")
         print()
 
+    def _detail(self, message: str):
+        """Guarda uma linha de detalhe do teste em execução nesta thread."""
+        self._details.lines.append(f"   {message}")
+
     def run_test(self, test_name: str, test_func) -> bool:
         """Executa um teste e registra o resultado."""
+        self._details.lines = []
         try:
             result = test_func()
-            if result:
+        except Exception as e:
+            error_msg = f"{type(e).__name__}: {str(e)}"
+            return self._record(test_name, False, error_msg, error_msg)
+
+        if result:
+            return self._record(test_name, True)
+        return self._record(test_name, False, "Teste retornou False", "Test returned False")
+
+    def _record(self, test_name: str, passed: bool, message: str = "", error: str = None) -> bool:
+        """Registra o resultado de um teste (seguro entre threads)."""
+        details = self._details.lines
+        self._details.lines = []
+        with self._lock:
+            # Detalhes e resultado saem juntos, sem intercalar com testes de outras threads
+            for line in details:
+                print(line)
+            if passed:
                 self.tests_passed += 1
                 self.print_test(test_name, "PASS")
                 self.test_results.append({"test": test_name, "status": "PASS", "error": None})
-                return True
             else:
                 self.tests_failed += 1
-                self.print_test(test_name, "FAIL", "Teste retornou False")
-                self.test_results.append({"test": test_name, "status": "FAIL", "error": "Test returned False"})
-                return False
-        except Exception as e:
-            self.tests_failed += 1
-            error_msg = f"{type(e).__name__}: {str(e)}"
-            self.print_test(test_name, "FAIL", error_msg)
-            self.test_results.append({"test": test_name, "status": "FAIL", "error": error_msg})
-            return False
+                self.print_test(test_name, "FAIL", message)
+                self.test_results.append({"test": test_name, "status": "FAIL", "error": error})
+        return passed
 
     def test_python_version(self) -> bool:
         """Testa se a versão do Python é compatível."""
         version = sys.version_info
         if version.major == 3 and version.minor >= 8:
-            print(f"   Python {version.major}.{version.minor}.{version.micro}")
+            self._detail(f"Python {version.major}.{version.minor}.{version.micro}")
             return True
         return False
 
     def test_required_packages(self) -> bool:
         """Testa se todos os pacotes necessários estão instalados."""
+        # Nomes de distribuição (pip), consultados nos metadados instalados
+        # (*.dist-info) sem importar os pacotes
         required_packages = [
             'langchain',
             'openai', 
@@ -76,30 +108,28 @@ class EnvironmentTester:
             'streamlit',
             'pandas',
             'plotly',
-            'python_dotenv',
-            'tiktoken'
+            'python-dotenv',
+            'tiktoken',
+            'faiss-cpu',
+            'orjson',
+            'pydantic',
+            'fastembed',
+            'aiohttp'
         ]
 
         missing_packages = []
 
         for package in required_packages:
             try:
-                __import__(package)
-            except ImportError:
-                # Tenta nomes alternativos
-                if package == 'python_dotenv':
-                    try:
-                        __import__('dotenv')
-                    except ImportError:
-                        missing_packages.append(package)
-                else:
-                    missing_packages.append(package)
+                distribution(package)
+            except PackageNotFoundError:
+                missing_packages.append(package)
 
         if missing_packages:
-            print(f"   Pacotes faltando: {', '.join(missing_packages)}")
+            self._detail(f"Pacotes faltando: {', '.join(missing_packages)}")
             return False
 
-        print(f"   Todos os {len(required_packages)} pacotes necessários estão instalados")
+        self._detail(f"Todos os {len(required_packages)} pacotes necessários estão instalados")
         return True
 
     def test_environment_variables(self) -> bool:
@@ -122,12 +152,12 @@ class EnvironmentTester:
                 missing_optional.append(var)
 
         if missing_required:
-            print(f"   Variáveis obrigatórias faltando: {', '.join(missing_required)}")
+            self._detail(f"Variáveis obrigatórias faltando: {', '.join(missing_required)}")
             return False
 
-        print(f"   Variáveis obrigatórias configuradas: {', '.join(required_vars)}")
+        self._detail(f"Variáveis obrigatórias configuradas: {', '.join(required_vars)}")
         if missing_optional:
-            print(f"   Variáveis opcionais faltando: {', '.join(missing_optional)}")
+            self._detail(f"Variáveis opcionais faltando: {', '.join(missing_optional)}")
 
         return True
 
@@ -151,25 +181,31 @@ class EnvironmentTester:
             'output'
         ]
 
-        missing_files = []
-        missing_dirs = []
+        # Uma listagem (os.scandir) por diretório pai, em vez de um stat por caminho
+        listings = {}
+        for path in required_files + required_dirs:
+            parent = os.path.dirname(path) or '.'
+            if parent not in listings:
+                try:
+                    with os.scandir(parent) as entries:
+                        listings[parent] = {entry.name for entry in entries}
+                except OSError:
+                    listings[parent] = set()
 
-        for file_path in required_files:
-            if not os.path.exists(file_path):
-                missing_files.append(file_path)
+        def exists(path: str) -> bool:
+            return os.path.basename(path) in listings[os.path.dirname(path) or '.']
 
-        for dir_path in required_dirs:
-            if not os.path.exists(dir_path):
-                missing_dirs.append(dir_path)
+        missing_files = [file_path for file_path in required_files if not exists(file_path)]
+        missing_dirs = [dir_path for dir_path in required_dirs if not exists(dir_path)]
 
         if missing_files or missing_dirs:
             if missing_files:
-                print(f"   Arquivos faltando: {', '.join(missing_files)}")
+                self._detail(f"Arquivos faltando: {', '.join(missing_files)}")
             if missing_dirs:
-                print(f"   Diretórios faltando: {', '.join(missing_dirs)}")
+                self._detail(f"Diretórios faltando: {', '.join(missing_dirs)}")
             return False
 
-        print(f"   Estrutura de arquivos completa")
+        self._detail(f"Estrutura de arquivos completa")
         return True
 
     def test_preprocessor_import(self) -> bool:
@@ -178,7 +214,7 @@ class EnvironmentTester:
         from utils.preprocessor import LogPreprocessor
 
         preprocessor = LogPreprocessor()
-        print(f"   LogPreprocessor importado com sucesso")
+        self._detail(f"LogPreprocessor importado com sucesso")
         return True
 
     def test_log_analyzer_import(self) -> bool:
@@ -186,7 +222,7 @@ class EnvironmentTester:
         sys.path.append('.')
         from agents.log_analyzer import LogAnalyzerAgent
 
-        print(f"   LogAnalyzerAgent importado com sucesso")
+        self._detail(f"LogAnalyzerAgent importado com sucesso")
         return True
 
     def test_example_log_processing(self) -> bool:
@@ -195,21 +231,21 @@ class EnvironmentTester:
         from utils.preprocessor import LogPreprocessor
 
         if not os.path.exists('data/example.log'):
-            print("   Arquivo example.log não encontrado")
+            self._detail("Arquivo example.log não encontrado")
             return False
 
         preprocessor = LogPreprocessor()
         chunks, patterns = preprocessor.process_log_file('data/example.log')
 
         if len(chunks) == 0:
-            print("   Nenhum chunk foi processado")
+            self._detail("Nenhum chunk foi processado")
             return False
 
         if patterns['total_errors'] == 0:
-            print("   Nenhum erro foi detectado no log de exemplo")
+            self._detail("Nenhum erro foi detectado no log de exemplo")
             return False
 
-        print(f"   Processados {len(chunks)} chunks, {patterns['total_errors']} erros detectados")
+        self._detail(f"Processados {len(chunks)} chunks, {patterns['total_errors']} erros detectados")
         return True
 
     def test_openai_connection(self) -> bool:
@@ -219,25 +255,32 @@ class EnvironmentTester:
 
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
-            print("   OPENAI_API_KEY não configurada - pulando teste")
+            self._detail("OPENAI_API_KEY não configurada - pulando teste")
             return True
 
         try:
+            import openai
             from openai import OpenAI
-            
-            client = OpenAI(api_key=api_key)
-            # Inicializando o cliente sem o argumento 'proxies'
 
-            # Teste simples de conexão
-            response = client.chat.completions.create(model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": "Hello"}],
-            max_tokens=5)
+            client = OpenAI(api_key=api_key)
+            # Teste de conexão sem custo de tokens: listagem de modelos (GET /v1/models)
+            next(iter(client.models.list()), None)
 
-            print(f"   Conexão com OpenAI estabelecida com sucesso")
+            self._detail(f"Conexão com OpenAI estabelecida com sucesso")
             return True
 
+        except ImportError as e:
+            # Tratado antes das demais exceções, que dependem do módulo openai importado
+            self._detail(f"Cliente OpenAI v1 indisponível (requer openai>=1.x): {str(e)}")
+            return False
+        except openai.AuthenticationError as e:
+            self._detail(f"Chave da OpenAI rejeitada (verifique OPENAI_API_KEY): {str(e)}")
+            return False
+        except openai.APIConnectionError as e:
+            self._detail(f"Não foi possível conectar à API da OpenAI: {str(e)}")
+            return False
         except Exception as e:
-            print(f"   Erro na conexão com OpenAI: {str(e)}")
+            self._detail(f"Erro na conexão com OpenAI: {str(e)}")
             return False
 
     def test_chromadb_initialization(self) -> bool:
@@ -252,7 +295,7 @@ class EnvironmentTester:
             api_key = os.getenv('OPENAI_API_KEY')
 
             if not api_key:
-                print("   OPENAI_API_KEY necessária para teste do ChromaDB")
+                self._detail("OPENAI_API_KEY necessária para teste do ChromaDB")
                 return False
 
             # Testa inicialização básica
@@ -267,25 +310,25 @@ class EnvironmentTester:
             if os.path.exists("./test_vectorstore"):
                 shutil.rmtree("./test_vectorstore")
 
-            print(f"   ChromaDB inicializado com sucesso")
+            self._detail(f"ChromaDB inicializado com sucesso")
             return True
 
         except Exception as e:
-            print(f"   Erro na inicialização do ChromaDB: {str(e)}")
+            self._detail(f"Erro na inicialização do ChromaDB: {str(e)}")
             return False
 
     def test_streamlit_import(self) -> bool:
         """Testa se o Streamlit pode ser importado."""
         import streamlit as st
-        print(f"   Streamlit importado com sucesso")
+        self._detail(f"Streamlit importado com sucesso")
         return True
 
     def run_all_tests(self):
         """Executa todos os testes."""
         self.print_header()
 
-        # Lista de testes
-        tests = [
+        # Testes locais (rodam em sequência na thread principal)
+        local_tests = [
             ("Versão do Python", self.test_python_version),
             ("Pacotes Necessários", self.test_required_packages),
             ("Variáveis de Ambiente", self.test_environment_variables),
@@ -293,14 +336,25 @@ class EnvironmentTester:
             ("Import do Preprocessor", self.test_preprocessor_import),
             ("Import do Log Analyzer", self.test_log_analyzer_import),
             ("Processamento do Log de Exemplo", self.test_example_log_processing),
-            ("Conexão OpenAI", self.test_openai_connection),
-            ("Inicialização ChromaDB", self.test_chromadb_initialization),
             ("Import do Streamlit", self.test_streamlit_import)
         ]
 
-        # Executa testes
-        for test_name, test_func in tests:
-            self.run_test(test_name, test_func)
+        # Testes dependentes de rede, independentes entre si: disparados em paralelo
+        # enquanto os locais executam, de modo que a latência de rede fica encoberta
+        network_tests = [
+            ("Conexão OpenAI", self.test_openai_connection),
+            ("Inicialização ChromaDB", self.test_chromadb_initialization)
+        ]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(self.run_test, test_name, test_func)
+                for test_name, test_func in network_tests
+            ]
+            for test_name, test_func in local_tests:
+                self.run_test(test_name, test_func)
+            for future in futures:
+                future.result()
 
         # Resumo final
         self.print_summary()
@@ -333,8 +387,6 @@ class EnvironmentTester:
     def save_test_results(self):
         """Salva resultados dos testes em arquivo JSON."""
         try:
-            os.makedirs('output', exist_ok=True)
-
             results = {
                 'timestamp': datetime.now().isoformat(),
                 'total_tests': self.tests_passed + self.tests_failed,
@@ -344,10 +396,14 @@ class EnvironmentTester:
                 'test_details': self.test_results
             }
 
-            with open('output/test_results.json', 'w') as f:
-                json.dump(results, f, indent=2)
+            self.output_dir.mkdir(exist_ok=True)
+            results_path = self.output_dir / 'test_results.json'
+            if orjson is not None:
+                results_path.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+            else:
+                results_path.write_text(json.dumps(results, indent=2), encoding='utf-8')
 
-            print(f"📄 Resultados salvos em: output/test_results.json")
+            print(f"📄 Resultados salvos em: {results_path}")
 
         except Exception as e:
             print(f"⚠️  Erro ao salvar resultados: {e}")
@@ -0,0 +1,123 @@
+"""
+Cache persistente para o Agente IA de Análise de Logs de Erro.
+
+Este módulo contém:
+- Camada LRU em memória para acessos repetidos na mesma execução
+- Persistência em SQLite para reaproveitamento entre execuções
+- Cache de resultados por chunk de log (hash do conteúdo + modelo)
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict
+
+
+class SQLiteCache:
+    """
+    Cache chave/valor (strings) com LRU em memória e persistência em SQLite.
+    """
+
+    def __init__(self, db_path: str, maxsize: int = 4096):
+        """
+        Inicializa o cache.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite
+            maxsize (int): Número máximo de entradas mantidas em memória
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _remember(self, key: str, value: str):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Retorna o valor associado à chave, ou None se não estiver em cache.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key: str, value: str):
+        """
+        Armazena o valor em memória e no SQLite.
+        """
+        with self._lock:
+            self._remember(key, value)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            self._conn.commit()
+
+
+class ResultCache:
+    """
+    Cache persistente das análises de cada chunk de log, por hash do conteúdo e modelo.
+
+    Permite pular a análise de chunks já vistos em execuções anteriores
+    (reprocessamento do mesmo arquivo ou de arquivos sobrepostos).
+    """
+
+    def __init__(self, cache_dir: str, maxsize: int = 1024):
+        """
+        Inicializa o cache.
+
+        Args:
+            cache_dir (str): Diretório onde o banco SQLite do cache é criado
+            maxsize (int): Número máximo de entradas mantidas em memória
+        """
+        self._store = SQLiteCache(os.path.join(cache_dir, "results.sqlite"), maxsize=maxsize)
+
+    @staticmethod
+    def make_key(chunk_text: str, model_name: str) -> str:
+        """
+        Chave do cache: SHA-256 do texto (normalizado) do chunk combinado ao modelo.
+        """
+        digest = hashlib.sha256(chunk_text.encode('utf-8')).hexdigest()
+        return f"{model_name}:{digest}"
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """
+        Retorna as análises em cache do chunk, ou None.
+        """
+        cached = self._store.get(key)
+        return json.loads(cached) if cached is not None else None
+
+    def put(self, key: str, value: List[Dict]):
+        """
+        Armazena as análises do chunk.
+        """
+        self._store.put(key, json.dumps(value, ensure_ascii=False))
@@ -0,0 +1,157 @@
+"""
+Cache persistente de embeddings para o Agente IA de Análise de Logs de Erro.
+
+Este módulo contém:
+- Armazenamento dos vetores (float32) em SQLite, por SHA-256 do texto, com expiração
+- Camada LRU em memória para acessos repetidos na mesma execução
+- Wrapper de embeddings que só calcula os textos ausentes do cache
+"""
+
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCache:
+    """
+    Cache de vetores de embedding com LRU em memória e persistência em SQLite.
+    """
+
+    def __init__(self, db_path: str, maxsize: int = 4096, ttl: float = 30 * 24 * 60 * 60):
+        """
+        Inicializa o cache.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite
+            maxsize (int): Número máximo de vetores mantidos em memória
+            ttl (float): Validade das entradas persistidas, em segundos
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vec BLOB NOT NULL, ts INTEGER NOT NULL)"
+        )
+        # Descarta de uma vez as entradas expiradas
+        self._conn.execute("DELETE FROM embeddings WHERE ts < ?", (int(time.time() - ttl),))
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> bytes:
+        """
+        Chave do cache: SHA-256 (binário) do modelo de embeddings combinado ao texto.
+        """
+        return hashlib.sha256(f"{namespace}\x00{text}".encode('utf-8')).digest()
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Retorna os vetores encontrados para as chaves (as ausentes ficam de fora).
+        """
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+
+            min_ts = int(time.time() - self.ttl)
+            # Consulta em lotes (limite de parâmetros do SQLite)
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE ts >= ? AND key IN ({placeholders})",
+                    [min_ts, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    found[key] = vector
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray]):
+        """
+        Armazena os vetores em memória e no SQLite, em uma única transação.
+        """
+        now = int(time.time())
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec, ts) VALUES (?, ?, ?)",
+                [(key, vector.tobytes(), now) for key, vector in items.items()]
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings com cache: textos já vistos (nesta ou em execuções anteriores)
+    não são recalculados nem reenviados à API.
+    """
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache, namespace: str):
+        """
+        Args:
+            base (Embeddings): Modelo de embeddings real
+            cache (EmbeddingCache): Cache dos vetores
+            namespace (str): Identificador do modelo, para não misturar vetores de modelos diferentes
+        """
+        self.base = base
+        self.cache = cache
+        self.namespace = namespace
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(self.namespace, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        # Calcula apenas os textos ausentes (sem repetir textos duplicados no lote)
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+        if pending:
+            vectors = self.base.embed_documents(list(pending.values()))
+            computed = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(pending, vectors)
+            }
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = EmbeddingCache.make_key(f"{self.namespace}:query", text)
+        cached: Optional[np.ndarray] = self.cache.get_many([key]).get(key)
+        if cached is None:
+            cached = np.asarray(self.base.embed_query(text), dtype=np.float32)
+            self.cache.put_many({key: cached})
+        return cached.tolist()
@@ -10,17 +10,88 @@ Este módulo contém funções para:
 
 import re
 import os
-import pandas as pd
+import sys
+import functools
+import itertools
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator, Iterable, Optional, Pattern, IO
 import tiktoken
 
 
+# Níveis considerados erro (strings internadas, compartilhadas por todas as entradas)
+_ERROR_LEVELS = frozenset(map(sys.intern, ('ERROR', 'CRITICAL', 'FATAL')))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(name: str) -> tiktoken.Encoding:
+    """
+    Encoding do tiktoken compartilhado por todas as instâncias (carregado uma única vez por processo).
+    """
+    return tiktoken.get_encoding(name)
+
+
+class _ErrorPatternAccumulator:
+    """
+    Agregadores de padrões de erro atualizados entrada a entrada, permitindo
+    extrair os padrões na mesma passada do parsing e do chunking.
+    """
+    
+    def __init__(self, keyword_pattern: Pattern):
+        self.keyword_pattern = keyword_pattern
+        self.total_errors = 0
+        self.component_counts = Counter()
+        self.error_keywords = Counter()
+        self.start = None
+        self.end = None
+    
+    def add(self, entry: Dict):
+        """
+        Contabiliza uma entrada de erro.
+        """
+        self.total_errors += 1
+        
+        # Contagem por componente
+        self.component_counts[entry['component']] += 1
+        
+        # Contagem por tipo de erro (palavras-chave): cada palavra conta uma vez por mensagem
+        found = self.keyword_pattern.findall(entry['message'])
+        if found:
+            self.error_keywords.update({keyword.lower() for keyword in found})
+        
+        # Intervalo de tempo (entradas sem timestamp válido são ignoradas)
+        timestamp = entry['timestamp']
+        if timestamp:
+            if self.start is None or timestamp < self.start:
+                self.start = timestamp
+            if self.end is None or timestamp > self.end:
+                self.end = timestamp
+    
+    def result(self) -> Dict:
+        """
+        Estatísticas e padrões acumulados até aqui.
+        """
+        return {
+            'total_errors': self.total_errors,
+            'component_distribution': self.component_counts,
+            'error_keywords': self.error_keywords,
+            'time_range': {'start': self.start, 'end': self.end} if self.start is not None else None
+        }
+
+
 class LogPreprocessor:
     """
     Classe responsável pelo pré-processamento de arquivos de log.
     """
     
+    # Máximo de textos com contagem de tokens memorizada (o cache é esvaziado ao passar do limite)
+    TOKEN_CACHE_SIZE = 100_000
+    # Tamanho dos blocos lidos por vez ao processar arquivos em streaming (caracteres)
+    READ_BLOCK_SIZE = 1 << 20
+    # Entradas tokenizadas por chamada ao encode_batch ao gerar chunks em streaming
+    TOKEN_BATCH_SIZE = 4096
+    
     def __init__(self, encoding_model: str = "cl100k_base"):
         """
         Inicializa o preprocessador de logs.
@@ -28,9 +99,23 @@ class LogPreprocessor:
         Args:
             encoding_model (str): Modelo de encoding para contagem de tokens
         """
-        self.encoding = tiktoken.get_encoding(encoding_model)
+        self.encoding_model = encoding_model
+        self.encoding = _get_encoding(encoding_model)
+        # Contagem de tokens já calculada por texto (logs repetem muito as mesmas mensagens)
+        self._token_counts = {}
+        # Cabeçalho de entrada no início de uma linha (espaços sem quebra de linha entre os campos),
+        # aplicado de uma vez sobre o buffer inteiro com finditer
         self.log_pattern = re.compile(
-            r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s+(\w+)\s+\[([^\]]+)\]\s+(.*)'
+            r'^[^\S\n]*(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})[^\S\n]+(\w+)[^\S\n]+'
+            r'\[([^\]\n]+)\][^\S\n]+(\S[^\n]*)',
+            re.MULTILINE
+        )
+        # Trechos voláteis (endereços hex, IDs numéricos longos, UUIDs) ignorados na deduplicação
+        self.volatile_pattern = re.compile(r'\b(0x[0-9a-f]+|\d{10,}|[a-f0-9-]{36})\b')
+        # Palavras-chave de tipo de erro em uma única alternação (busca por substring, sem diferenciar maiúsculas)
+        self.keyword_pattern = re.compile(
+            r'timeout|connection|failed|error|exception|denied|invalid|not found|unauthorized',
+            re.IGNORECASE
         )
     
     def read_log_file(self, file_path: str) -> str:
@@ -57,6 +142,69 @@ class LogPreprocessor:
         except IOError as e:
             raise IOError(f"Erro ao ler arquivo de log: {e}")
     
+    def __getstate__(self) -> Dict:
+        # Usado pelos workers de process_many: o encoding é recarregado pelo nome
+        # em cada processo e o cache de tokens não é copiado
+        state = self.__dict__.copy()
+        del state['encoding']
+        state['_token_counts'] = {}
+        return state
+    
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self.encoding = _get_encoding(self.encoding_model)
+    
+    def iter_blocks(self, fp: IO[str]) -> Iterator[str]:
+        """
+        Lê um objeto de arquivo em blocos de READ_BLOCK_SIZE caracteres, cada um
+        terminado em quebra de linha (nenhuma linha fica dividida entre blocos).
+        
+        Args:
+            fp (IO[str]): Objeto de arquivo em modo texto
+            
+        Yields:
+            str: Bloco de linhas completas
+        """
+        carry = []
+        while True:
+            block = fp.read(self.READ_BLOCK_SIZE)
+            if not block:
+                break
+            cut = block.rfind('\n')
+            if cut < 0:
+                carry.append(block)
+                continue
+            carry.append(block[:cut + 1])
+            yield "".join(carry)
+            carry = [block[cut + 1:]]
+        
+        tail = "".join(carry)
+        if tail:
+            yield tail
+    
+    def iter_log_blocks(self, file_path: str) -> Iterator[str]:
+        """
+        Lê um arquivo de log em blocos de linhas completas, sem carregá-lo inteiro na memória.
+        
+        Args:
+            file_path (str): Caminho para o arquivo de log
+            
+        Yields:
+            str: Bloco de linhas completas
+            
+        Raises:
+            FileNotFoundError: Se o arquivo não for encontrado
+            IOError: Se houver erro na leitura do arquivo
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                yield from self.iter_blocks(file)
+            print(f"✅ Arquivo de log lido com sucesso: {file_path}")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Arquivo de log não encontrado: {file_path}")
+        except IOError as e:
+            raise IOError(f"Erro ao ler arquivo de log: {e}")
+    
     def parse_log_entries(self, log_content: str) -> List[Dict]:
         """
         Faz o parsing das entradas de log extraindo metadados.
@@ -67,41 +215,98 @@ class LogPreprocessor:
         Returns:
             List[Dict]: Lista de dicionários com entradas de log parseadas
         """
-        entries = []
-        lines = log_content.strip().split('\n')
+        entries = list(self.iter_log_entries((log_content,)))
+        print(f"✅ {len(entries)} entradas de log parseadas com sucesso")
+        return entries
+    
+    def iter_log_entries(self, blocks: Iterable[str]) -> Iterator[Dict]:
+        """
+        Faz o parsing das entradas de log bloco a bloco, gerando cada entrada assim
+        que ela termina (no cabeçalho seguinte ou no fim do log).
         
-        for line_num, line in enumerate(lines, 1):
-            if not line.strip():
-                continue
-                
-            match = self.log_pattern.match(line.strip())
-            if match:
-                timestamp_str, level, component, message = match.groups()
-                
-                try:
-                    timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                except ValueError:
-                    timestamp = None
+        Args:
+            blocks (Iterable[str]): Blocos do log, cada um terminado em quebra de linha
+                (exceto, possivelmente, o último)
+            
+        Yields:
+            Dict: Entrada de log parseada
+        """
+        # Última entrada lida: ainda pode receber linhas de continuação do bloco seguinte
+        pending = None
+        line_num = 1
+        
+        for block in blocks:
+            last_start = 0
+            last_end = 0
+            
+            for match in self.log_pattern.finditer(block):
+                start, end = match.span()
+                # Texto entre o fim da entrada anterior e este cabeçalho: linhas de continuação
+                if pending is not None:
+                    if start - last_end > 1:
+                        self._append_continuation(pending, block[last_end:start])
+                    yield pending
                 
-                entry = {
-                    'line_number': line_num,
-                    'timestamp': timestamp,
-                    'timestamp_str': timestamp_str,
-                    'level': level.upper(),
-                    'component': component,
-                    'message': message,
-                    'full_line': line.strip(),
-                    'is_error': level.upper() in ['ERROR', 'CRITICAL', 'FATAL']
-                }
-                entries.append(entry)
-            else:
-                # Linha que não segue o padrão - pode ser continuação de erro anterior
-                if entries:
-                    entries[-1]['message'] += f" {line.strip()}"
-                    entries[-1]['full_line'] += f" {line.strip()}"
+                line_num += block.count('\n', last_start, start)
+                last_start, last_end = start, end
+                pending = self._make_entry(match, line_num)
+            
+            if pending is not None and len(block) > last_end:
+                self._append_continuation(pending, block[last_end:])
+            line_num += block.count('\n', last_start)
         
-        print(f"✅ {len(entries)} entradas de log parseadas com sucesso")
-        return entries
+        if pending is not None:
+            yield pending
+    
+    def _make_entry(self, match: re.Match, line_num: int) -> Dict:
+        """
+        Monta o dicionário de uma entrada a partir do cabeçalho casado pelo log_pattern.
+        """
+        timestamp_str, level, component, message = match.groups()
+        # Nível e componente se repetem muito: uma única cópia de cada string
+        level = sys.intern(level.upper())
+        component = sys.intern(component)
+        message = message.rstrip()
+        
+        # O regex já garante o formato 'AAAA-MM-DD HH:MM:SS': fromisoformat (em C) evita
+        # reinterpretar o formato a cada chamada, como o strptime
+        try:
+            timestamp = datetime.fromisoformat(timestamp_str)
+        except ValueError:
+            timestamp = None
+        
+        return {
+            'line_number': line_num,
+            'timestamp': timestamp,
+            'timestamp_str': timestamp_str,
+            'level': level,
+            'component': component,
+            'message': message,
+            'is_error': level in _ERROR_LEVELS
+        }
+    
+    def _append_continuation(self, entry: Dict, text: str):
+        """
+        Anexa à entrada as linhas que não seguem o padrão (continuação de erro anterior,
+        ex.: stack traces), separadas por espaço.
+        """
+        lines = [line.strip() for line in text.split('\n')]
+        continuation = " ".join(line for line in lines if line)
+        if continuation:
+            entry['message'] += f" {continuation}"
+    
+    def normalize_message(self, message: str) -> str:
+        """
+        Normaliza uma mensagem de erro para deduplicação, substituindo
+        identificadores voláteis por um marcador.
+        
+        Args:
+            message (str): Mensagem de erro original
+            
+        Returns:
+            str: Mensagem normalizada
+        """
+        return self.volatile_pattern.sub('<X>', message.strip().lower())
     
     def filter_error_entries(self, entries: List[Dict]) -> List[Dict]:
         """
@@ -117,6 +322,21 @@ class LogPreprocessor:
         print(f"✅ {len(error_entries)} entradas de erro identificadas")
         return error_entries
     
+    def count_error_entries(self, log_content: str) -> int:
+        """
+        Conta as entradas de erro varrendo só os cabeçalhos, sem montar as entradas.
+        
+        Args:
+            log_content (str): Conteúdo bruto do log
+            
+        Returns:
+            int: Quantidade de entradas de erro e críticas
+        """
+        return sum(
+            1 for match in self.log_pattern.finditer(log_content)
+            if match.group(2).upper() in _ERROR_LEVELS
+        )
+    
     def create_chunks(self, entries: List[Dict], max_tokens: int = 500) -> List[Dict]:
         """
         Cria chunks de texto para vetorização, respeitando limite de tokens.
@@ -128,50 +348,175 @@ class LogPreprocessor:
         Returns:
             List[Dict]: Lista de chunks com metadados
         """
-        chunks = []
+        chunks = list(self.iter_chunks(entries, max_tokens))
+        print(f"✅ {len(chunks)} chunks criados para vetorização")
+        return chunks
+    
+    def iter_chunks(self, entries: Iterable[Dict], max_tokens: int = 500) -> Iterator[Dict]:
+        """
+        Gera os chunks de texto um a um, à medida que cada chunk é fechado.
+        
+        Args:
+            entries (Iterable[Dict]): Entradas de log (lista ou gerador)
+            max_tokens (int): Número máximo de tokens por chunk
+            
+        Yields:
+            Dict: Chunk com metadados
+        """
+        chunk_count = 0
         current_chunk = []
         current_tokens = 0
+        # Agregados do chunk atual, atualizados a cada entrada (sem varrer o chunk ao fechá-lo)
+        current_lines = []
+        current_errors = 0
+        current_components = set()
+        current_levels = set()
         
-        for entry in entries:
-            # Calcula tokens da entrada atual
-            entry_text = f"{entry['timestamp_str']} {entry['level']} [{entry['component']}] {entry['message']}"
-            entry_tokens = len(self.encoding.encode(entry_text))
-            
+        for entry, entry_tokens in self._with_token_counts(entries):
             # Se adicionar esta entrada exceder o limite, finaliza chunk atual
             if current_tokens + entry_tokens > max_tokens and current_chunk:
-                chunk_text = "\n".join([e['full_line'] for e in current_chunk])
                 chunk = {
-                    'chunk_id': len(chunks),
-                    'text': chunk_text,
-                    'entries': current_chunk.copy(),
+                    'chunk_id': chunk_count,
+                    'text': "\n".join(current_lines),
+                    'entries': current_chunk,
                     'token_count': current_tokens,
-                    'error_count': sum(1 for e in current_chunk if e['is_error']),
-                    'components': list(set(e['component'] for e in current_chunk)),
-                    'levels': list(set(e['level'] for e in current_chunk))
+                    'error_count': current_errors,
+                    'components': list(current_components),
+                    'levels': list(current_levels)
                 }
-                chunks.append(chunk)
+                yield chunk
+                chunk_count += 1
                 current_chunk = []
                 current_tokens = 0
+                current_lines = []
+                current_errors = 0
+                current_components = set()
+                current_levels = set()
             
             current_chunk.append(entry)
             current_tokens += entry_tokens
+            # Linha remontada a partir dos campos (o texto exato que foi tokenizado)
+            current_lines.append(
+                f"{entry['timestamp_str']} {entry['level']} [{entry['component']}] {entry['message']}"
+            )
+            current_errors += entry['is_error']
+            current_components.add(entry['component'])
+            current_levels.add(entry['level'])
         
         # Adiciona último chunk se houver entradas restantes
         if current_chunk:
-            chunk_text = "\n".join([e['full_line'] for e in current_chunk])
             chunk = {
-                'chunk_id': len(chunks),
-                'text': chunk_text,
-                'entries': current_chunk.copy(),
+                'chunk_id': chunk_count,
+                'text': "\n".join(current_lines),
+                'entries': current_chunk,
                 'token_count': current_tokens,
-                'error_count': sum(1 for e in current_chunk if e['is_error']),
-                'components': list(set(e['component'] for e in current_chunk)),
-                'levels': list(set(e['level'] for e in current_chunk))
+                'error_count': current_errors,
+                'components': list(current_components),
+                'levels': list(current_levels)
             }
-            chunks.append(chunk)
+            yield chunk
+    
+    def _with_token_counts(self, entries: Iterable[Dict]) -> Iterator[Tuple[Dict, int]]:
+        """
+        Gera cada entrada com sua contagem de tokens, tokenizando em lotes de
+        TOKEN_BATCH_SIZE entradas (as entradas podem vir de um gerador).
+        """
+        entries = iter(entries)
+        while True:
+            batch = list(itertools.islice(entries, self.TOKEN_BATCH_SIZE))
+            if not batch:
+                return
+            
+            # O tokenizer nunca junta tokens entre o timestamp e o " NÍVEL" seguinte (a pré-tokenização
+            # separa dígitos de espaço + letras), então a contagem da entrada é a soma das duas partes:
+            # cada timestamp e cada mensagem distintos são tokenizados uma única vez
+            timestamp_tokens = self._count_tokens([entry['timestamp_str'] for entry in batch])
+            message_tokens = self._count_tokens([
+                f" {entry['level']} [{entry['component']}] {entry['message']}" for entry in batch
+            ])
+            yield from zip(batch, map(int.__add__, timestamp_tokens, message_tokens))
+    
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Conta os tokens de cada texto, tokenizando em uma única chamada (threads nativas,
+        sem o GIL) apenas os textos distintos ainda fora do cache.
+        """
+        counts = self._token_counts
+        missing = list(dict.fromkeys(text for text in texts if text not in counts))
+        if len(counts) + len(missing) > self.TOKEN_CACHE_SIZE:
+            counts.clear()
+            missing = list(dict.fromkeys(texts))
+        if missing:
+            encoded = self.encoding.encode_batch(missing, num_threads=os.cpu_count() or 1)
+            counts.update(zip(missing, map(len, encoded)))
+        return [counts[text] for text in texts]
+    
+    def iter_log_chunks(self, file_path: str, filter_errors_only: bool = True) -> Iterator[Dict]:
+        """
+        Lê, faz o parsing e gera os chunks de um arquivo de log incrementalmente,
+        permitindo que as etapas seguintes (embeddings, análise) comecem antes do fim.
         
-        print(f"✅ {len(chunks)} chunks criados para vetorização")
-        return chunks
+        Args:
+            file_path (str): Caminho para o arquivo de log
+            filter_errors_only (bool): Se deve filtrar apenas erros
+            
+        Yields:
+            Dict: Chunk com metadados
+        """
+        print(f"🔄 Iniciando processamento do arquivo: {file_path}")
+        yield from self._iter_block_chunks(self.iter_log_blocks(file_path), filter_errors_only)
+    
+    def iter_content_chunks(self, log_content: str, filter_errors_only: bool = True) -> Iterator[Dict]:
+        """
+        Faz o parsing e gera os chunks de um log já carregado em memória.
+        
+        Args:
+            log_content (str): Conteúdo bruto do log
+            filter_errors_only (bool): Se deve filtrar apenas erros
+            
+        Yields:
+            Dict: Chunk com metadados
+        """
+        yield from self._iter_block_chunks((log_content,), filter_errors_only)
+    
+    def iter_stream_chunks(self, fp: IO[str], filter_errors_only: bool = True) -> Iterator[Dict]:
+        """
+        Faz o parsing e gera os chunks de um log lido de um objeto de arquivo
+        (arquivo aberto, io.StringIO, upload decodificado), sem passar pelo disco.
+        
+        Args:
+            fp (IO[str]): Objeto de arquivo em modo texto
+            filter_errors_only (bool): Se deve filtrar apenas erros
+            
+        Yields:
+            Dict: Chunk com metadados
+        """
+        yield from self._iter_block_chunks(self.iter_blocks(fp), filter_errors_only)
+    
+    def _iter_block_chunks(self, blocks: Iterable[str], filter_errors_only: bool,
+                           patterns: Optional[_ErrorPatternAccumulator] = None) -> Iterator[Dict]:
+        """
+        Parsing, filtragem e chunking em streaming: cada entrada segue para o chunk
+        atual assim que é lida, sem materializar a lista completa de entradas.
+        Se informado, o acumulador de padrões é atualizado na mesma passada.
+        """
+        totals = {'entries': 0, 'errors': 0}
+        
+        def selected_entries():
+            for entry in self.iter_log_entries(blocks):
+                totals['entries'] += 1
+                if entry['is_error']:
+                    totals['errors'] += 1
+                    if patterns is not None:
+                        patterns.add(entry)
+                elif filter_errors_only:
+                    continue
+                yield entry
+        
+        yield from self.iter_chunks(selected_entries())
+        print(f"✅ {totals['entries']} entradas de log parseadas com sucesso")
+        if filter_errors_only:
+            print(f"✅ {totals['errors']} entradas de erro identificadas")
     
     def extract_error_patterns(self, entries: List[Dict]) -> Dict:
         """
@@ -183,34 +528,12 @@ class LogPreprocessor:
         Returns:
             Dict: Estatísticas e padrões identificados
         """
-        error_entries = self.filter_error_entries(entries)
-        
-        # Contagem por componente
-        component_counts = {}
-        for entry in error_entries:
-            component = entry['component']
-            component_counts[component] = component_counts.get(component, 0) + 1
-        
-        # Contagem por tipo de erro (palavras-chave)
-        error_keywords = {}
-        for entry in error_entries:
-            message = entry['message'].lower()
-            keywords = ['timeout', 'connection', 'failed', 'error', 'exception', 
-                       'denied', 'invalid', 'not found', 'unauthorized']
-            for keyword in keywords:
-                if keyword in message:
-                    error_keywords[keyword] = error_keywords.get(keyword, 0) + 1
-        
-        patterns = {
-            'total_errors': len(error_entries),
-            'component_distribution': component_counts,
-            'error_keywords': error_keywords,
-            'time_range': {
-                'start': min(e['timestamp'] for e in error_entries if e['timestamp']),
-                'end': max(e['timestamp'] for e in error_entries if e['timestamp'])
-            } if error_entries else None
-        }
+        accumulator = _ErrorPatternAccumulator(self.keyword_pattern)
+        for entry in entries:
+            if entry['is_error']:
+                accumulator.add(entry)
         
+        patterns = accumulator.result()
         print(f"✅ Padrões de erro extraídos: {patterns['total_errors']} erros analisados")
         return patterns
     
@@ -227,24 +550,42 @@ class LogPreprocessor:
         """
         print(f"🔄 Iniciando processamento do arquivo: {file_path}")
         
-        # Lê o arquivo
-        content = self.read_log_file(file_path)
-        
-        # Faz parsing das entradas
-        entries = self.parse_log_entries(content)
-        
-        # Filtra erros se solicitado
-        if filter_errors_only:
-            entries = self.filter_error_entries(entries)
-        
-        # Cria chunks
-        chunks = self.create_chunks(entries)
+        # Leitura, parsing, filtragem, chunking e extração de padrões em uma única passada
+        accumulator = _ErrorPatternAccumulator(self.keyword_pattern)
+        chunks = list(self._iter_block_chunks(
+            self.iter_log_blocks(file_path), filter_errors_only, accumulator
+        ))
+        print(f"✅ {len(chunks)} chunks criados para vetorização")
         
-        # Extrai padrões
-        patterns = self.extract_error_patterns(entries)
+        patterns = accumulator.result()
+        print(f"✅ Padrões de erro extraídos: {patterns['total_errors']} erros analisados")
         
         print(f"✅ Processamento concluído: {len(chunks)} chunks, {patterns['total_errors']} erros")
         return chunks, patterns
+    
+    def process_many(self, file_paths: List[str], filter_errors_only: bool = True,
+                     max_workers: Optional[int] = None) -> List[Tuple[List[Dict], Dict]]:
+        """
+        Processa vários arquivos de log em paralelo, um processo por arquivo
+        (parsing e tokenização são CPU-bound e não escalam com threads).
+        
+        Args:
+            file_paths (List[str]): Caminhos dos arquivos de log
+            filter_errors_only (bool): Se deve filtrar apenas erros
+            max_workers (Optional[int]): Número de processos (padrão: núcleos disponíveis)
+            
+        Returns:
+            List[Tuple[List[Dict], Dict]]: Chunks e padrões de cada arquivo, na ordem recebida
+        """
+        if len(file_paths) <= 1:
+            return [self.process_log_file(file_path, filter_errors_only) for file_path in file_paths]
+        
+        workers = min(len(file_paths), max_workers or os.cpu_count() or 1)
+        print(f"🔄 Processando {len(file_paths)} arquivos em {workers} processos")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                self.process_log_file, file_paths, itertools.repeat(filter_errors_only)
+            ))
 
 
 def main():
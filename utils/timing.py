@@ -0,0 +1,94 @@
+"""
+Instrumentação de latência para o Agente IA de Análise de Logs de Erro.
+
+Este módulo contém:
+- Decorador para medir a duração de chamadas externas (síncronas ou assíncronas)
+- Acumulador de latências por nome de operação
+- Relatório de percentis (p50/p95/p99) das latências coletadas
+"""
+
+import math
+import time
+import asyncio
+import functools
+from collections import defaultdict
+from typing import Dict, List
+
+
+# Latências coletadas (em segundos) por nome de operação
+_LATENCIES = defaultdict(list)
+
+
+def timed(name: str):
+    """
+    Decorador que registra a duração de cada chamada da função em `name`.
+
+    Args:
+        name (str): Nome da operação no relatório (ex.: 'llm_invoke')
+    """
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _LATENCIES[name].append(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _LATENCIES[name].append(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """
+    Percentil pelo método do posto mais próximo (valores já ordenados).
+    """
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def latency_summary() -> Dict[str, Dict[str, float]]:
+    """
+    Resume as latências coletadas por operação.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Para cada operação, 'count' e p50/p95/p99 em milissegundos
+    """
+    summary = {}
+    for name, values in _LATENCIES.items():
+        if not values:
+            continue
+        ordered = sorted(values)
+        summary[name] = {
+            'count': len(ordered),
+            'p50_ms': _percentile(ordered, 50) * 1000,
+            'p95_ms': _percentile(ordered, 95) * 1000,
+            'p99_ms': _percentile(ordered, 99) * 1000,
+        }
+    return summary
+
+
+def report_latencies(reset: bool = True):
+    """
+    Imprime o relatório de latências e, opcionalmente, zera as medições.
+
+    Args:
+        reset (bool): Se deve descartar as medições após o relatório
+    """
+    summary = latency_summary()
+    if summary:
+        print("📊 Latências das chamadas externas:")
+        for name, stats in sorted(summary.items()):
+            print(f"  - {name}: n={stats['count']} p50={stats['p50_ms']:.1f}ms "
+                  f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms")
+    if reset:
+        _LATENCIES.clear()
@@ -0,0 +1,308 @@
+"""
+Bancos vetoriais do Agente IA de Análise de Logs de Erro.
+
+Este módulo contém:
+- Interface comum de backend vetorial (inserção, busca e persistência)
+- Backend ChromaDB (cliente nativo, vetores pré-calculados)
+- Backend FAISS (índice HNSW com vetores quantizados em int8 e metadados em JSON auxiliar)
+- Backend FAISS exato (produto interno sobre vetores normalizados, em float16) para coleções pequenas
+- Fábrica para criar o backend configurado
+"""
+
+import os
+import json
+from abc import ABC, abstractmethod
+from typing import List, Dict
+
+
+# Backends aceitos por create_vector_backend (e pela opção --vector-backend / QA_VSTORE)
+VECTOR_BACKENDS = ('faiss', 'faiss-flat', 'chroma')
+
+
+class VectorBackend(ABC):
+    """
+    Interface dos backends vetoriais usados pelo agente.
+
+    Os vetores chegam já calculados; o backend apenas armazena e busca.
+    Backends sem add, query ou count falham já ao serem instanciados.
+    """
+
+    @abstractmethod
+    def add(self, embeddings: List[List[float]], metadatas: List[Dict],
+            ids: List[str], documents: List[str]):
+        """
+        Adiciona vetores com seus metadados, ids e textos.
+        """
+
+    @abstractmethod
+    def query(self, query_embeddings: List[List[float]], k: int) -> List[List[Dict]]:
+        """
+        Busca os k vizinhos mais próximos de cada vetor de consulta.
+
+        Returns:
+            List[List[Dict]]: Para cada consulta, lista de dicionários com as
+            chaves 'document', 'metadata' e 'distance' (menor = mais similar)
+        """
+
+    def persist(self):
+        """
+        Grava o estado em disco (quando o backend exigir).
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """
+        Número de vetores armazenados.
+        """
+
+
+class ChromaBackend(VectorBackend):
+    """
+    Backend ChromaDB usando o cliente nativo (sem o wrapper do LangChain).
+
+    O PersistentClient grava cada inserção no disco, dispensando persist().
+    """
+
+    COLLECTION_NAME = "logs"
+
+    def __init__(self, persist_directory: str):
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=persist_directory)
+        self.collection = self.client.get_or_create_collection(
+            self.COLLECTION_NAME,
+            embedding_function=None
+        )
+
+    def add(self, embeddings, metadatas, ids, documents):
+        self.collection.add(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            documents=documents
+        )
+
+    def query(self, query_embeddings, k):
+        if self.count() == 0:
+            return [[] for _ in query_embeddings]
+
+        response = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k,
+            include=['documents', 'metadatas', 'distances']
+        )
+        return [
+            [
+                {'document': document, 'metadata': metadata or {}, 'distance': distance}
+                for document, metadata, distance in zip(documents, metadatas, distances)
+            ]
+            for documents, metadatas, distances in zip(
+                response['documents'], response['metadatas'], response['distances']
+            )
+        ]
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+class FAISSBackend(VectorBackend):
+    """
+    Backend FAISS com índice HNSW: inserções em O(lote), sem regravar a coleção inteira.
+
+    Os vetores são armazenados com quantização escalar de 8 bits (IndexHNSWSQ),
+    ocupando 4x menos memória e disco que float32. Até acumular
+    MIN_TRAINING_VECTORS vetores a coleção fica em um índice exato (IndexFlatL2,
+    mesma escala de distância); ao atingir esse volume o quantizador é treinado
+    uma única vez com todos eles e o índice é reconstruído. O índice é salvo com
+    faiss.write_index e os ids/metadados/textos em um JSON auxiliar.
+    """
+
+    INDEX_FILE = "index.faiss"
+    META_FILE = "index_meta.json"
+    HNSW_NEIGHBORS = 32
+    # Vetores necessários para estimar a faixa de valores por dimensão do quantizador de 8 bits
+    MIN_TRAINING_VECTORS = 4096
+
+    def __init__(self, persist_directory: str):
+        import faiss
+
+        self.faiss = faiss
+        self.persist_directory = persist_directory
+        self.index_path = os.path.join(persist_directory, self.INDEX_FILE)
+        self.meta_path = os.path.join(persist_directory, self.META_FILE)
+
+        self.index = None
+        self.ids = []
+        self.metadatas = []
+        self.documents = []
+
+        if os.path.exists(self.index_path) and os.path.exists(self.meta_path):
+            self.index = faiss.read_index(self.index_path)
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.ids = meta['ids']
+            self.metadatas = meta['metadatas']
+            self.documents = meta['documents']
+
+    def _as_matrix(self, vectors):
+        import numpy as np
+
+        return np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+
+    def add(self, embeddings, metadatas, ids, documents):
+        if not embeddings:
+            return
+
+        matrix = self._as_matrix(embeddings)
+        if self.index is None:
+            self.index = self.faiss.IndexFlatL2(matrix.shape[1])
+
+        self.index.add(matrix)
+        self.ids.extend(ids)
+        self.metadatas.extend(metadatas)
+        self.documents.extend(documents)
+
+        if isinstance(self.index, self.faiss.IndexFlat) and self.index.ntotal >= self.MIN_TRAINING_VECTORS:
+            self._build_quantized_index()
+
+    def _build_quantized_index(self):
+        """
+        Troca o índice exato pelo HNSW quantizado, treinando o quantizador com
+        todos os vetores acumulados até aqui.
+        """
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        index = self.faiss.IndexHNSWSQ(
+            vectors.shape[1], self.faiss.ScalarQuantizer.QT_8bit, self.HNSW_NEIGHBORS
+        )
+        # Faixa de valores por dimensão do quantizador, aprendida com amostra representativa
+        index.train(vectors)
+        index.add(vectors)
+        self.index = index
+
+    def query(self, query_embeddings, k):
+        if self.index is None or self.index.ntotal == 0:
+            return [[] for _ in query_embeddings]
+
+        distances, positions = self.index.search(self._as_matrix(query_embeddings), k)
+        return [
+            [
+                {
+                    'document': self.documents[position],
+                    'metadata': self.metadatas[position],
+                    'distance': float(distance)
+                }
+                for distance, position in zip(row_distances, row_positions)
+                if position >= 0
+            ]
+            for row_distances, row_positions in zip(distances, positions)
+        ]
+
+    def persist(self):
+        if self.index is None:
+            return
+
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self.faiss.write_index(self.index, self.index_path)
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'ids': self.ids, 'metadatas': self.metadatas, 'documents': self.documents},
+                f, ensure_ascii=False
+            )
+
+    def count(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+
+class FAISSFlatBackend(FAISSBackend):
+    """
+    Backend FAISS com busca exata (varredura por produto interno) sobre vetores normalizados em L2.
+
+    Para coleções pequenas (até ~100 mil vetores) a varredura exata com o kernel
+    SIMD de produto interno é mais rápida que percorrer o grafo HNSW. Os vetores
+    são armazenados em float16 (IndexScalarQuantizer QT_fp16): metade da memória
+    e da banda de leitura por busca, sem etapa de treino e com erro desprezível
+    no cosseno de vetores unitários. A distância retornada é ||a - b||² entre
+    vetores unitários (2 - 2·cos), na mesma escala do índice HNSW.
+
+    Vetores nulos (norma zero) não têm direção: não são indexados e, como
+    consulta, não retornam vizinhos.
+    """
+
+    INDEX_FILE = "index_flat.faiss"
+    META_FILE = "index_flat_meta.json"
+
+    def _as_matrix(self, vectors):
+        matrix = super()._as_matrix(vectors)
+        # Normalização única na entrada: produto interno passa a ser similaridade de cosseno
+        self.faiss.normalize_L2(matrix)
+        return matrix
+
+    @staticmethod
+    def _nonzero_rows(matrix) -> List[bool]:
+        import numpy as np
+
+        return (np.einsum('ij,ij->i', matrix, matrix) > 0).tolist()
+
+    def add(self, embeddings, metadatas, ids, documents):
+        if not embeddings:
+            return
+
+        matrix = self._as_matrix(embeddings)
+        valid = self._nonzero_rows(matrix)
+        if not all(valid):
+            matrix = matrix[valid]
+            ids = [item for item, keep in zip(ids, valid) if keep]
+            metadatas = [item for item, keep in zip(metadatas, valid) if keep]
+            documents = [item for item, keep in zip(documents, valid) if keep]
+            if not ids:
+                return
+
+        if self.index is None:
+            self.index = self.faiss.IndexScalarQuantizer(
+                matrix.shape[1], self.faiss.ScalarQuantizer.QT_fp16, self.faiss.METRIC_INNER_PRODUCT
+            )
+
+        self.index.add(matrix)
+        self.ids.extend(ids)
+        self.metadatas.extend(metadatas)
+        self.documents.extend(documents)
+
+    def query(self, query_embeddings, k):
+        if self.index is None or self.index.ntotal == 0:
+            return [[] for _ in query_embeddings]
+
+        matrix = self._as_matrix(query_embeddings)
+        scores, positions = self.index.search(matrix, k)
+        return [
+            [
+                {
+                    'document': self.documents[position],
+                    'metadata': self.metadatas[position],
+                    # Vetores unitários: ||a - b||² = 2 - 2·cos
+                    'distance': max(2.0 - 2.0 * float(score), 0.0)
+                }
+                for score, position in zip(row_scores, row_positions)
+                if position >= 0
+            ] if valid else []
+            for row_scores, row_positions, valid in zip(scores, positions, self._nonzero_rows(matrix))
+        ]
+
+
+def create_vector_backend(backend: str, persist_directory: str) -> VectorBackend:
+    """
+    Cria o backend vetorial configurado.
+
+    Args:
+        backend (str): 'faiss', 'faiss-flat' ou 'chroma'
+        persist_directory (str): Diretório de persistência
+
+    Returns:
+        VectorBackend: Backend inicializado
+    """
+    if backend == "faiss":
+        return FAISSBackend(persist_directory)
+    if backend == "faiss-flat":
+        return FAISSFlatBackend(persist_directory)
+    if backend == "chroma":
+        return ChromaBackend(persist_directory)
+    raise ValueError(f"Backend vetorial desconhecido: {backend}")